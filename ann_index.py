@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+import argparse
+import numpy as np
+from role_index import matrix_scores
+
+IVF_FILE = "ann_ivf.npz"
+
+logger = logging.getLogger(__name__)
+
+
+def _top_k(scores, k):
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part_scores, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+class ExactIndex:
+    """Brute-force inner product over every row (rows are L2-normalised, so this is cosine)."""
+
+    kind = "exact"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def search(self, queries, k):
+        return _top_k(matrix_scores(queries, self.matrix), k)
+
+
+def spherical_kmeans(matrix, n_clusters, iters=10, seed=0):
+    """k-means on the unit sphere; returns (centroids, assignments)."""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, matrix.shape[0])
+    centroids = np.array(matrix[rng.choice(matrix.shape[0], n_clusters, replace=False)], dtype=np.float32)
+    for _ in range(iters):
+        assignments = np.argmax(matrix @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, matrix)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # Re-seed empty clusters from random rows so every list stays usable
+        sums[empty] = matrix[rng.choice(matrix.shape[0], int(empty.sum()))]
+        norms[empty] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids, np.argmax(matrix @ centroids.T, axis=1)
+
+
+class IVFIndex:
+    """Inverted-file index: rows bucketed by nearest k-means centroid, nprobe buckets scanned per query."""
+
+    kind = "ivf"
+
+    def __init__(self, matrix, centroids, row_ids, offsets, nprobe=8, embeddings_sha256=""):
+        self.matrix = matrix
+        self.centroids = centroids
+        self.row_ids = row_ids
+        self.offsets = offsets
+        self.nprobe = nprobe
+        self.embeddings_sha256 = embeddings_sha256
+
+    @classmethod
+    def build(cls, matrix, nlist=0, nprobe=8, iters=10, train_size=None, embeddings_sha256="", seed=0):
+        rows = matrix.shape[0]
+        nlist = nlist or max(1, int(4 * np.sqrt(rows)))
+        # Train centroids on a sample, then assign every row once
+        train_size = min(rows, train_size or nlist * 64)
+        sample = np.random.default_rng(seed).choice(rows, train_size, replace=False)
+        centroids, _ = spherical_kmeans(np.asarray(matrix[np.sort(sample)], dtype=np.float32), nlist, iters, seed)
+        assignments = np.empty(rows, dtype=np.int64)
+        for start in range(0, rows, 65536):
+            block = np.asarray(matrix[start:start + 65536], dtype=np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        row_ids = np.argsort(assignments, kind="stable")
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=len(centroids)))))
+        return cls(matrix, centroids, row_ids, offsets, nprobe, embeddings_sha256)
+
+    def search(self, queries, k, nprobe=None):
+        queries = np.atleast_2d(queries)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        _, probes = _top_k(queries @ self.centroids.T, nprobe)
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for qi, query in enumerate(queries):
+            candidates = np.concatenate([self.row_ids[self.offsets[c]:self.offsets[c + 1]] for c in probes[qi]])
+            if not len(candidates):
+                continue
+            scores, order = _top_k((self.matrix[candidates] @ query)[None, :], k)
+            all_scores[qi, :scores.shape[1]] = scores[0]
+            all_rows[qi, :scores.shape[1]] = candidates[order[0]]
+        return all_scores, all_rows
+
+    def save(self, store_path):
+        tmp = os.path.join(store_path, IVF_FILE + ".tmp.npz")
+        np.savez(tmp, centroids=self.centroids, row_ids=self.row_ids, offsets=self.offsets,
+                 nprobe=self.nprobe, embeddings_sha256=self.embeddings_sha256)
+        os.replace(tmp, os.path.join(store_path, IVF_FILE))
+
+    @classmethod
+    def load(cls, store_path, matrix):
+        with np.load(os.path.join(store_path, IVF_FILE)) as data:
+            return cls(matrix, data["centroids"], data["row_ids"], data["offsets"],
+                       int(data["nprobe"]), str(data["embeddings_sha256"]))
+
+
+def build_store_index(store_path, index_config):
+    """Build and persist the configured ANN index next to an embedding store (no-op for exact search)."""
+    from embedding_store import load_embeddings
+    store = load_embeddings(store_path)
+    store_path = store.path  # the live version when store_path is a versioned root
+    ivf_path = os.path.join(store_path, IVF_FILE)
+    if index_config.get("type", "exact") != "ivf" or store.manifest["rows"] < index_config.get("min_rows", 0):
+        if os.path.exists(ivf_path):
+            os.remove(ivf_path)
+        return None
+    started = time.perf_counter()
+    index = IVFIndex.build(store.embeddings, nlist=index_config.get("nlist", 0),
+                           nprobe=index_config.get("nprobe", 8), embeddings_sha256=store.manifest["sha256"])
+    index.save(store_path)
+    logger.info(f"✅ Built IVF index ({len(index.centroids)} lists over {store.manifest['rows']} rows) "
+                f"in {time.perf_counter() - started:.1f}s")
+    return index
+
+
+def load_store_index(store_path, store, index_config):
+    """The persisted ANN index for this store, or None when exact search should be used.
+
+    ``store_path`` must be the directory the store was loaded from (``store.path``).
+    """
+    ivf_path = os.path.join(store_path, IVF_FILE)
+    if index_config.get("type", "exact") != "ivf" or not os.path.exists(ivf_path):
+        return None
+    index = IVFIndex.load(store_path, store.embeddings)
+    if index.embeddings_sha256 != store.manifest["sha256"]:
+        logger.warning("⚠️ ANN index was built for different embeddings, falling back to exact search.")
+        return None
+    index.nprobe = index_config.get("nprobe", index.nprobe)
+    return index
+
+
+def recall_at_k(index, exact, queries, k=10):
+    """Mean fraction of the exact top-k rows that the index also returns."""
+    _, exact_rows = exact.search(queries, k)
+    _, approx_rows = index.search(queries, k)
+    hits = [len(set(e) & set(a)) / len(e) for e, a in zip(exact_rows.tolist(), approx_rows.tolist())]
+    return float(np.mean(hits))
+
+
+if __name__ == "__main__":
+    from config.load_config import load_config
+    from instrumentation import setup_logging
+
+    setup_logging()
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Build or check the ANN index for the role embedding store.")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    store_path = config["paths"]["role_embeddings_path"]
+    if args.command == "build":
+        build_store_index(store_path, config.get("index", {}))
+    else:
+        from evaluate import evaluate_index_recall
+        report = evaluate_index_recall(k=args.k)
+        print(f"🎯 recall@{args.k}: {report['recall']:.4f} | exact {report['exact_ms']:.3f} ms/query "
+              f"| {report['kind']} {report['ann_ms']:.3f} ms/query")
@@ -2,19 +2,18 @@ import asyncio
 import streamlit as st
 st.set_page_config(page_title="AI Job Recommender", page_icon="🤖", layout="centered")
 import pandas as pd
-import os
-from datetime import datetime
-from sentence_transformers import SentenceTransformer
+import time
 from model_utils import (
-    extract_text_from_resume,
-    recommend_top_roles_from_resume,
-    roles,
-    descriptions,
-    role_embeddings,
+    extract_text_cached,
+    recommend_top_roles_cached,
     log_prediction,
-    clean_text,
-    compute_and_save_metrics
+    log_feedback,
+    compute_and_save_metrics,
+    ExtractionError
 )
+import model_registry
+import instrumentation
+from config.load_config import load_config
 from evaluate import evaluate_model
 from firebase_utils import initialize_firebase, upload_user_feedback, upload_model_log
 
@@ -24,38 +23,16 @@ try:
 except RuntimeError:
     asyncio.set_event_loop(asyncio.new_event_loop())
 
+# ✅ Logging from config.yaml; metrics endpoint/textfile when metrics.enabled
+instrumentation.setup_logging()
+instrumentation.start_exporters()
+
 # ✅ Initialize Firebase early
 initialize_firebase()
 
-# ✅ Load model using Streamlit caching
-@st.cache_resource
-def load_model():
-    model = SentenceTransformer('all-mpnet-base-v2', device='cpu')
-    return model
-
-model = load_model()
-
-# ✅ Feedback log path
-LOG_PATH = "logs/user_feedback.csv"
-MODEL_LOG_PATH = "logs/model_logs.csv"
-expected_columns = ["timestamp", "resume_text", "predicted_role", "true_role"]
-
-# ✅ Ensure feedback file structure
-os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-if not os.path.exists(LOG_PATH):
-    st.info("📁 Creating new feedback file with correct headers...")
-    df = pd.DataFrame(columns=expected_columns)
-    df.to_csv(LOG_PATH, index=False)
-else:
-    df = pd.read_csv(LOG_PATH, on_bad_lines='skip')
-    df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
-    for col in expected_columns:
-        if col not in df.columns:
-            df[col] = ""
-    df = df[expected_columns]
-    df.dropna(subset=["resume_text", "true_role"], inplace=True)
-    df.to_csv(LOG_PATH, index=False)
-
+# ✅ Model and role embeddings load once per process on first use (opt-in warm-up)
+if load_config()["model"].get("warm_up", False):
+    model_registry.warm_up()
 
 # ✅ App Header
 st.markdown("<h1 style='text-align: center; color: #4CAF50;'>📄 AI-Powered Job Role Recommender</h1>", unsafe_allow_html=True)
@@ -67,23 +44,39 @@ uploaded_file = st.file_uploader("📎 Upload Resume", type=["pdf", "docx"])
 # ✅ Main logic
 if uploaded_file:
     with st.spinner("⚙️ Extracting and analyzing your resume..."):
-        resume_text = extract_text_from_resume(uploaded_file)
-        results, skills = recommend_top_roles_from_resume(resume_text, roles, descriptions, role_embeddings, model)
-        evaluation_metrics = compute_and_save_metrics(results)
-        log_prediction(resume_text, results, skills, evaluation_metrics)
-
-        # ✅ Upload model logs
+        # ✅ Cached by upload bytes / cleaned text, so widget reruns and repeat uploads skip inference
+        started = time.perf_counter()
         try:
-            upload_model_log(
-                resume_text=resume_text,
-                predicted_roles=[r["role"] for r in results],
-                confidence_scores=[r["confidence"] for r in results],
-                resume_keywords=skills
-            )
-        except Exception as e:
-            st.error(f"⚠️ Error uploading model logs to Firebase: {e}")
+            resume_text, upload_key = extract_text_cached(uploaded_file)
+        except ExtractionError as e:
+            instrumentation.inc("rejected_uploads_total")
+            st.error(f"⚠️ {e}")
+            st.stop()
+        extracted = time.perf_counter()
+        results, skills = recommend_top_roles_cached(resume_text)
+        analysed = time.perf_counter()
+
+        # ✅ Log each upload once per session, not on every rerun
+        if st.session_state.get("logged_upload") != upload_key:
+            evaluation_metrics = compute_and_save_metrics(results)
+
+            # ✅ Upload model logs
+            push_key = None
+            try:
+                push_key = upload_model_log(
+                    resume_text=resume_text,
+                    predicted_roles=[r["role"] for r in results],
+                    confidence_scores=[r["confidence"] for r in results],
+                    resume_keywords=skills
+                )
+            except Exception as e:
+                st.error(f"⚠️ Error uploading model logs to Firebase: {e}")
+            # ✅ Same push key locally, so a later Firebase sync does not duplicate this row
+            log_prediction(resume_text, results, skills, evaluation_metrics, key=push_key)
+            st.session_state["logged_upload"] = upload_key
 
     st.success("✅ Analysis Complete!")
+    st.caption(f"⏱️ Extraction {(extracted - started) * 1000:.0f} ms · Inference {(analysed - extracted) * 1000:.0f} ms")
 
     st.markdown("## 🎯 Top Job Role Matches")
 
@@ -112,6 +105,16 @@ st.title("🧪 Model Evaluation Dashboard")
 st.metric(label="Top-3 Accuracy", value=f"{accuracy * 100:.2f}%")
 st.bar_chart(similarity_scores_list)
 
+# ✅ Where the latency budget goes (this process, since start)
+if instrumentation.enabled():
+    metrics = instrumentation.snapshot()
+    with st.expander("⏱️ Latency & Resource Metrics"):
+        if metrics["stages"]:
+            st.dataframe(pd.DataFrame(metrics["stages"]).set_index("stage"))
+        else:
+            st.caption("No requests timed yet.")
+        st.json({"counters": metrics["counters"], "gauges": metrics["gauges"]})
+
 # ✅ Feedback Section - Smarter Version
 st.title("📝 Resume Role Recommender Feedback")
 st.markdown("""
@@ -133,8 +136,9 @@ if submit:
     elif not correct_role.strip():
         st.error("⚠️ Please enter your actual (correct) role.")
     else:
+        push_key = None
         try:
-            upload_user_feedback(
+            push_key = upload_user_feedback(
                 resume_text=feedback_resume_text,
                 predicted_role=predicted_role.strip(),
                 true_role=correct_role.strip()
@@ -142,3 +146,4 @@ if submit:
             st.success("🎉 Thanks! Your feedback has been recorded and uploaded to Firebase!")
         except Exception as e:
             st.error(f"⚠️ Error uploading feedback to Firebase: {e}")
+        log_feedback(feedback_resume_text, predicted_role.strip(), correct_role.strip(), key=push_key)
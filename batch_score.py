@@ -0,0 +1,161 @@
+# batch_score.py
+#
+# Score a directory (or manifest) of PDF/DOCX resumes against the current role embeddings:
+#   python batch_score.py resumes/ --output artifacts/batch_scores.jsonl
+#   python batch_score.py manifest.txt --output scores.csv --batch-size 64 --workers 8
+#
+# Text extraction runs in a process pool, cleaned texts are encoded in batches, and results are
+# appended after every batch. Re-running with the same output resumes where the last run stopped;
+# rows scored against an older embeddings version are scored again.
+
+import os
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+from datetime import datetime
+from config.load_config import load_config
+
+RESUME_EXTENSIONS = (".pdf", ".docx")
+CSV_COLUMNS = ["path", "status", "error", "predicted_roles", "confidence_scores",
+               "extract_seconds", "embeddings_version", "scored_at"]
+
+
+def discover_inputs(source):
+    """Resume paths from a directory (recursive) or a manifest (one path per line, or CSV with a 'path' column)."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(RESUME_EXTENSIONS))
+        return sorted(paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        if source.lower().endswith(".csv"):
+            paths = [row["path"] for row in csv.DictReader(f) if row.get("path")]
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+
+def load_checkpoint(output_path, embeddings_version):
+    """Paths already scored against the current embeddings version."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f) if output_path.endswith(".csv") else (json.loads(line) for line in f if line.strip())
+        try:
+            for row in rows:
+                if row.get("embeddings_version") == embeddings_version:
+                    done.add(row["path"])
+        except ValueError:
+            pass  # torn last line from an interrupted run; everything before it still counts
+    return done
+
+
+def _extract(path):
+    from extraction import extract_resume
+    try:
+        # Already one file per pool worker, so no nested page-level parallelism
+        result = extract_resume(path, parallel=False)
+        return path, result.text, None, result.seconds
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}", None
+
+
+class ResultWriter:
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.is_csv = output_path.endswith(".csv")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._file = open(output_path, "a", encoding="utf-8", newline="")
+        if self.is_csv:
+            self._writer = csv.DictWriter(self._file, fieldnames=CSV_COLUMNS, quoting=csv.QUOTE_ALL)
+            if new_file:
+                self._writer.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.is_csv:
+                self._writer.writerow({
+                    **row,
+                    "predicted_roles": json.dumps(row["predicted_roles"]),
+                    "confidence_scores": json.dumps(row["confidence_scores"])
+                })
+            else:
+                self._file.write(json.dumps(row) + "\n")
+        # Each flushed batch is a checkpoint: a crash loses at most the batch in flight
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def score_resumes(paths, output_path, batch_size=32, workers=None, top_n=3):
+    from model_utils import get_role_data, recommend_top_roles_batch
+
+    role_data = get_role_data()
+    done = load_checkpoint(output_path, role_data.version)
+    pending = [p for p in paths if p not in done]
+    print(f"✅ {len(paths)} resumes found, {len(done)} already scored, {len(pending)} to go.")
+    if not pending:
+        return 0
+
+    writer = ResultWriter(output_path)
+    scored = 0
+    started = time.perf_counter()
+
+    def flush(batch):
+        nonlocal scored
+        now = datetime.now().isoformat()
+        texts = [text for _, text, _ in batch]
+        results = recommend_top_roles_batch(texts, top_n=top_n, role_index=role_data.index, batch_size=batch_size)
+        writer.write([{
+            "path": path, "status": "ok", "error": "",
+            "predicted_roles": [r["role"] for r in result],
+            "confidence_scores": [r["confidence"] for r in result],
+            "extract_seconds": seconds, "embeddings_version": role_data.version, "scored_at": now
+        } for (path, _, seconds), result in zip(batch, results)])
+        scored += len(batch)
+        rate = scored / (time.perf_counter() - started)
+        print(f"⚙️ Scored {scored}/{len(pending)} resumes ({rate:.1f}/s)")
+
+    # Workers only extract text; encoding and scoring stay batched in this process
+    with multiprocessing.Pool(processes=workers) as pool:
+        batch = []
+        for path, text, error, seconds in pool.imap(_extract, pending, chunksize=4):
+            if error or not (text or "").strip():
+                writer.write([{
+                    "path": path, "status": "error", "error": error or "No text extracted",
+                    "predicted_roles": [], "confidence_scores": [], "extract_seconds": seconds,
+                    "embeddings_version": role_data.version, "scored_at": datetime.now().isoformat()
+                }])
+                continue
+            batch.append((path, text, seconds))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+    writer.close()
+    print(f"✅ Results written to {output_path}")
+    return scored
+
+
+if __name__ == "__main__":
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Bulk-score PDF/DOCX resumes against the role embeddings.")
+    parser.add_argument("source", help="Directory of resumes, or a manifest (.txt one path per line / .csv with a 'path' column)")
+    parser.add_argument("--output", default="artifacts/batch_scores.jsonl", help="Output .jsonl or .csv (appended; resumable)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--top-n", type=int, default=config["model"].get("top_n", 3))
+    args = parser.parse_args()
+
+    score_resumes(discover_inputs(args.source), args.output,
+                  batch_size=args.batch_size, workers=args.workers, top_n=args.top_n)
@@ -0,0 +1,338 @@
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+import fitz
+from config.load_config import load_config
+
+RESULTS_PATH = "artifacts/benchmarks/latest.json"
+BASELINE_PATH = "artifacts/benchmarks/baseline.json"
+GROUPS = ("extraction", "text", "encode", "scoring", "logging", "evaluation", "retrain")
+DEFAULT_SCALES = (1000, 10000, 100000, 500000)
+
+
+# ---- measurement ---------------------------------------------------------
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource  # no /proc (macOS): lifetime peak is the best available
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class PeakRSS:
+    """Samples resident memory on a background thread while a stage runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+def run_stage(fn, items=1, repeat=20, warmup=2):
+    """Time ``fn`` ``repeat`` times after ``warmup`` untimed calls; ``items`` is work per call."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    with PeakRSS() as rss:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - started)
+    ms = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "throughput_per_s": round(items * repeat / float(np.sum(latencies)), 3),
+        "items": items,
+        "repeat": repeat,
+        "peak_rss_mb": round(rss.peak / 1e6, 1)
+    }
+
+
+# ---- fixtures ------------------------------------------------------------
+
+def _corpus_text(chars):
+    roles_df = pd.read_csv(load_config()["paths"]["role_data_path"])
+    text = " ".join(roles_df["Cleaned_Description"].dropna().astype(str).head(200))
+    return (text * (chars // max(len(text), 1) + 1))[:chars]
+
+
+def make_pdf(path, pages, chars_per_page=2500):
+    text = _corpus_text(pages * chars_per_page)
+    with fitz.open() as doc:
+        for i in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(page.rect + (36, 36, -36, -36), text[i * chars_per_page:(i + 1) * chars_per_page],
+                                fontsize=7)
+        doc.save(path)
+    return path
+
+
+def make_docx(path, chars):
+    # Minimal WordprocessingML package: enough for extraction, no python-docx dependency
+    paragraphs = "".join(f"<w:p><w:r><w:t>{escape(chunk)}</w:t></w:r></w:p>"
+                         for chunk in _wrap(_corpus_text(chars), 500))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        z.writestr("word/document.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                   f"<w:body>{paragraphs}</w:body></w:document>")
+    return path
+
+
+def _wrap(text, width):
+    return [text[i:i + width] for i in range(0, len(text), width)]
+
+
+def synthetic_roles(rows, dim, seed=0):
+    """Random unit vectors labelled with ~10 rows per role, standing in for a scaled role corpus."""
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((rows, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    labels = [f"role_{i}" for i in rng.integers(0, max(1, rows // 10), rows)]
+    return labels, matrix
+
+
+# ---- stages --------------------------------------------------------------
+
+def bench_extraction(workdir, repeat):
+    from model_utils import extract_text_from_resume
+    results = {}
+    for pages in (1, 5, 30):
+        path = make_pdf(os.path.join(workdir, f"resume_{pages}p.pdf"), pages)
+        results[f"extract_pdf_{pages}p"] = run_stage(lambda: extract_text_from_resume(path), repeat=repeat)
+    for chars in (3000, 30000):
+        path = make_docx(os.path.join(workdir, f"resume_{chars}c.docx"), chars)
+        results[f"extract_docx_{chars // 1000}k"] = run_stage(lambda: extract_text_from_resume(path), repeat=repeat)
+    return results
+
+
+def bench_text(workdir, repeat):
+    from model_utils import clean_text
+    from skill_extractor import get_skill_extractor
+    text = _corpus_text(6000)
+    extractor = get_skill_extractor()
+    texts = [text] * 32
+    return {
+        "clean_text_6k": run_stage(lambda: clean_text(text), repeat=repeat * 10),
+        "skills_6k": run_stage(lambda: extractor.extract(text), repeat=repeat * 10),
+        "skills_b32_6k": run_stage(lambda: extractor.extract_batch(texts), items=len(texts), repeat=repeat)
+    }
+
+
+def bench_encode(workdir, repeat):
+    from model_utils import encode_texts, get_model, clean_text
+    model = get_model()
+    text = clean_text(_corpus_text(3000))
+    results = {}
+    for batch_size in (1, 8, 32):
+        texts = [text] * batch_size
+        results[f"encode_b{batch_size}"] = run_stage(lambda: encode_texts(texts, model, batch_size=batch_size),
+                                                     items=batch_size, repeat=max(3, repeat // batch_size), warmup=1)
+    return results
+
+
+def bench_scoring(workdir, repeat):
+    from model_utils import encode_texts, get_model, get_role_data, clean_text, recommend_top_roles_from_resume
+    data = get_role_data()
+    text = _corpus_text(3000)
+    query = encode_texts([clean_text(text)], get_model())
+    results = {"role_top_k": run_stage(lambda: data.index.top_k(query, 3), repeat=repeat * 10)}
+    if data.index.lexical is not None:
+        lexical = data.index.lexical
+        results["lexical_query_3k"] = run_stage(lambda: lexical.scores(lexical.query_matrix([text])),
+                                                repeat=repeat * 10)
+        lexical_query = lexical.query_matrix([text])
+        results["role_top_k_hybrid"] = run_stage(lambda: data.index.top_k(query, 3, lexical_queries=lexical_query),
+                                                 repeat=repeat * 10)
+    return {
+        **results,
+        "recommend_end_to_end": run_stage(lambda: recommend_top_roles_from_resume(text, role_index=data.index),
+                                          repeat=repeat)
+    }
+
+
+def bench_logging(workdir, repeat):
+    from log_store import LogStore
+    settings = load_config().get("log_store", {})
+    store = LogStore("model_logs", root=os.path.join(workdir, "logs"), flush_rows=settings.get("flush_rows", 50),
+                     flush_seconds=settings.get("flush_seconds", 5), import_legacy=False)
+    record = {"resume_text": _corpus_text(3000), "predicted_roles": ["a", "b", "c"],
+              "confidence_scores": [90.0, 80.0, 70.0], "resume_keywords": ["python"]}
+    result = {"log_prediction": run_stage(lambda: store.append(record), repeat=repeat * 50)}
+    store.flush()
+    return result
+
+
+def bench_evaluation(workdir, repeat, scales):
+    from evaluate import evaluate_model
+    from model_utils import get_model, get_role_data
+    model = get_model()
+    eval_path = load_config()["model"].get("precision_eval_path", "Sample_Evaluation_Data.csv")
+    rows = len(pd.read_csv(eval_path))
+    results = {"evaluate_model": run_stage(lambda: evaluate_model(eval_path, model=model, use_cache=False),
+                                           items=rows, repeat=max(3, repeat // 5), warmup=1)}
+    dim = get_role_data().embeddings.shape[1]
+    for scale in scales:
+        labels, matrix = synthetic_roles(scale, dim)
+        results[f"evaluate_model_{scale // 1000}k_rows"] = run_stage(
+            lambda labels=labels, matrix=matrix: evaluate_model(eval_path, model=model, roles=labels,
+                                                                role_embeddings=matrix, use_cache=False),
+            items=rows, repeat=3, warmup=1)
+    return results
+
+
+def bench_retrain(workdir, repeat, scales):
+    # Encoding cost per text is covered by the encode stages; these time what retrain.py does with
+    # the vectors at scale: per-role prototypes, versioned store publish, and the role index build.
+    from embedding_store import role_prototypes, prototype_settings, publish_embeddings
+    from role_index import RoleIndex
+    from model_utils import get_role_data
+    dim = get_role_data().embeddings.shape[1]
+    prototypes = prototype_settings(load_config())
+    results = {}
+    for scale in scales:
+        labels, matrix = synthetic_roles(scale, dim)
+        store_path = os.path.join(workdir, f"store_{scale}")
+
+        def retrain_step(labels=labels, matrix=matrix, store_path=store_path):
+            roles, embeddings = role_prototypes(labels, matrix, prototypes["per_role"], prototypes["method"])
+            publish_embeddings(store_path, embeddings, roles, "benchmark", keep=1)
+            return RoleIndex(roles, embeddings)
+
+        results[f"retrain_aggregate_{scale // 1000}k_rows"] = run_stage(retrain_step, items=scale, repeat=3, warmup=0)
+    return results
+
+
+# ---- reporting -----------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def environment():
+    import torch
+    config = load_config()
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "model": config["model"]["embedding_model_name"],
+        "precision": config["model"].get("precision", "fp32")
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Stages whose p95 latency rose or throughput fell by more than ``tolerance`` versus the baseline."""
+    regressions = []
+    for name, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_per_s"] < previous["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_per_s']} -> {current['throughput_per_s']}/s")
+    return regressions
+
+
+def run(groups=GROUPS, scales=DEFAULT_SCALES, repeat=20):
+    workdir = tempfile.mkdtemp(prefix="resume_bench_")
+    stages = {}
+    try:
+        for group in groups:
+            started = time.perf_counter()
+            bench = globals()[f"bench_{group}"]
+            args = (workdir, repeat, scales) if group in ("evaluation", "retrain") else (workdir, repeat)
+            stages.update(bench(*args))
+            print(f"⏱️ {group} benchmarks done in {time.perf_counter() - started:.1f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {"environment": environment(), "stages": stages}
+
+
+def print_table(results):
+    print(f"{'stage':<32}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'items/s':>12}{'RSS MB':>9}")
+    for name, s in results["stages"].items():
+        print(f"{name:<32}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['throughput_per_s']:>12}{s['peak_rss_mb']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency/throughput benchmarks for the recommendation pipeline.")
+    parser.add_argument("--groups", default=",".join(GROUPS), help=f"comma-separated subset of {','.join(GROUPS)}")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="synthetic role corpus sizes for the evaluation/retrain groups")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput change vs baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+
+    results = run(groups=[g for g in args.groups.split(",") if g],
+                  scales=[int(s) for s in args.scales.split(",") if s], repeat=args.repeat)
+    print_table(results)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        shutil.copyfile(args.output, args.baseline)
+        print(f"✅ Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
+    else:
+        print(f"⚠️ No baseline at {args.baseline}; run with --save-baseline to create one.")
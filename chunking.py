@@ -0,0 +1,107 @@
+import numpy as np
+from config.load_config import load_config
+
+POOLINGS = ("off", "mean", "max", "attention")
+
+
+def chunk_settings(config=None):
+    model_config = (config or load_config())["model"]
+    settings = {
+        "pooling": model_config.get("chunk_pooling", "off"),
+        "chunk_tokens": int(model_config.get("chunk_tokens", 0)),
+        "max_chunks": max(1, int(model_config.get("max_chunks", 8))),
+        "attention_temperature": float(model_config.get("chunk_attention_temperature", 0.1))
+    }
+    if settings["pooling"] not in POOLINGS:
+        raise ValueError(f"Unknown chunk pooling '{settings['pooling']}', expected one of {POOLINGS}")
+    return settings
+
+
+def chunking_signature(settings):
+    """Short tag for cache keys: results differ between pooling modes and chunk limits."""
+    if settings["pooling"] == "off":
+        return "off"
+    return f"{settings['pooling']}-{settings['max_chunks']}x{settings['chunk_tokens'] or 'auto'}"
+
+
+def chunk_text(text, tokenizer, chunk_tokens, max_chunks, chars_per_token=6):
+    """Split text into at most ``max_chunks`` pieces of at most ``chunk_tokens`` tokens each.
+
+    Only a prefix long enough for the token budget is tokenized (doubled until it
+    is, or the text runs out), so the cost of a 40-page resume is the same as
+    one that just fills the budget. Returns (chunks, token_counts).
+    """
+    budget = chunk_tokens * max_chunks
+    prefix_chars = budget * chars_per_token
+    while True:
+        prefix = text[:prefix_chars]
+        offsets = tokenizer(prefix, add_special_tokens=False, return_offsets_mapping=True,
+                            verbose=False)["offset_mapping"]
+        if len(offsets) >= budget or prefix_chars >= len(text):
+            break
+        prefix_chars *= 2
+    offsets = offsets[:budget]
+    if not offsets:
+        return [text], [0]
+    chunks, counts = [], []
+    for start in range(0, len(offsets), chunk_tokens):
+        end = min(start + chunk_tokens, len(offsets))
+        chunks.append(prefix[offsets[start][0]:offsets[end - 1][1]])
+        counts.append(end - start)
+    return chunks, counts
+
+
+def pool_chunks(vectors, chunks_per_doc, token_counts, pooling="mean", temperature=0.1, relevance=None):
+    """Collapse consecutive chunk vectors into one L2-normalised vector per document.
+
+    ``relevance`` (one score per chunk, e.g. its best match against the role rows)
+    drives attention pooling; without it chunks are weighted by agreement with the
+    document's mean vector.
+    """
+    starts = np.concatenate(([0], np.cumsum(chunks_per_doc)[:-1])).astype(np.int64)
+    weights = np.maximum(np.asarray(token_counts, dtype=np.float32), 1.0)[:, None]
+    if pooling == "max":
+        pooled = np.maximum.reduceat(vectors, starts, axis=0)
+    elif pooling == "mean":
+        # Token-weighted, so a short trailing chunk does not count as much as a full one
+        pooled = np.add.reduceat(vectors * weights, starts, axis=0)
+    else:
+        # Attention: softmax over each document's chunks, so role-relevant sections dominate and
+        # boilerplate (references, contact details, hobbies) contributes little
+        doc_ids = np.repeat(np.arange(len(starts)), chunks_per_doc)
+        if relevance is None:
+            means = np.add.reduceat(vectors * weights, starts, axis=0)
+            means /= np.maximum(np.linalg.norm(means, axis=1, keepdims=True), 1e-12)
+            relevance = np.einsum("ij,ij->i", vectors, means[doc_ids])
+        logits = np.asarray(relevance, dtype=np.float64) / temperature
+        logits -= np.maximum.reduceat(logits, starts)[doc_ids]
+        attention = np.exp(logits)
+        attention /= np.add.reduceat(attention, starts)[doc_ids]
+        pooled = np.add.reduceat(vectors * attention[:, None], starts, axis=0)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (pooled / norms).astype(np.float32)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+    from evaluate import evaluate_chunking
+
+    parser = argparse.ArgumentParser(description="Measure accuracy/latency of each chunk pooling mode.")
+    parser.add_argument("--eval", default="Sample_Evaluation_Data.csv")
+    parser.add_argument("--pad-tokens", type=int, default=600,
+                        help="boilerplate tokens placed before each resume in the long-document variant")
+    parser.add_argument("--output", default="artifacts/chunking_report.json")
+    args = parser.parse_args()
+
+    report = evaluate_chunking(args.eval, pad_tokens=args.pad_tokens)
+    print(f"{'pooling':<12}{'short acc':>10}{'long acc':>10}{'ms/resume':>11}{'chunks':>8}")
+    for row in report:
+        print(f"{row['pooling']:<12}{row['accuracy']:>10.3f}{row['long_accuracy']:>10.3f}"
+              f"{row['long_ms_per_resume']:>11.2f}{row['max_chunks']:>8}")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report saved to {args.output}")
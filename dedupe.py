@@ -0,0 +1,174 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import numpy as np
+import pandas as pd
+from config.load_config import load_config
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def dedupe_settings(config=None):
+    settings = (config or load_config()).get("dedupe", {})
+    return {
+        "enabled": settings.get("enabled", True),
+        "shingle_words": settings.get("shingle_words", 5),
+        "num_perm": settings.get("num_perm", 64),
+        "bands": settings.get("bands", 16),
+        "threshold": settings.get("threshold", 0.8),
+        "max_per_role": settings.get("max_per_role", 0),
+        "sample_fraction": settings.get("sample_fraction", 1.0),
+        "report_path": settings.get("report_path", "artifacts/dedupe_report.json")
+    }
+
+
+def normalize_text(text):
+    # Case, punctuation and whitespace edits should not make a resume "new"
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(text).lower()).split())
+
+
+def content_hash(normalized):
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def shingle_hashes(normalized, k=5):
+    """32-bit hashes of the distinct k-word shingles (the whole text when it is shorter than k words)."""
+    words = normalized.split()
+    shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """num_perm universal hash functions; a text's signature is its minimum under each."""
+
+    def __init__(self, num_perm=64, seed=0):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, hashes):
+        # (a * x + b) mod p with x < 2^32 and a, b < 2^61: the product can wrap uint64, which
+        # keeps it a fixed pseudo-random permutation per function, all that MinHash needs
+        values = (hashes[:, None] * self.a[None, :] + self.b[None, :]) % MERSENNE_PRIME
+        return (values & MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures: texts sharing any band are candidates, verified by signature."""
+
+    def __init__(self, num_perm=64, bands=16, threshold=0.8):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = []
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def find_or_add(self, signature):
+        """Id of a stored near-duplicate (estimated Jaccard >= threshold), else store it and return None."""
+        keys = self._band_keys(signature)
+        seen = set()
+        for band, key in enumerate(keys):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        new_id = len(self._signatures)
+        self._signatures.append(signature)
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(new_id)
+        return None
+
+
+def _hash_rank(hashes):
+    # Uniform in [0, 1) from the content hash: a record's sampling fate never changes between runs,
+    # so retrains only encode (and shift role vectors by) records that are actually new
+    return np.array([int(h[:8], 16) / 0x100000000 for h in hashes])
+
+
+def dedupe_records(df, text_column="resume_text", role_column="true_role", settings=None):
+    """Drop exact and near-duplicate texts within each role, then sample and cap per role.
+
+    Earlier rows win, so pass records oldest first. Returns (kept rows, report).
+    """
+    settings = settings or dedupe_settings()
+    report = {"input": len(df), "exact_duplicates": 0, "near_duplicates": 0, "sampled_out": 0, "capped": 0}
+    if df.empty:
+        return df, {**report, "output": 0, "roles": {}}
+
+    normalized = df[text_column].astype(str).map(normalize_text)
+    hashes = normalized.map(content_hash)
+    keys = df[role_column].astype(str) + "\0" + hashes
+    exact = keys.duplicated().to_numpy()
+    report["exact_duplicates"] = int(exact.sum())
+
+    keep = ~exact
+    if settings["threshold"] < 1:
+        hasher = MinHasher(settings["num_perm"])
+        indexes = {}
+        for position in np.flatnonzero(keep):
+            role = str(df[role_column].iat[position])
+            index = indexes.setdefault(role, LSHIndex(settings["num_perm"], settings["bands"], settings["threshold"]))
+            signature = hasher.signature(shingle_hashes(normalized.iat[position], settings["shingle_words"]))
+            if index.find_or_add(signature) is not None:
+                keep[position] = False
+                report["near_duplicates"] += 1
+
+    rank = _hash_rank(hashes.tolist())
+    kept = df[keep].assign(_rank=rank[keep])
+    if settings["sample_fraction"] < 1:
+        # Stratified: ceil(fraction * n) records of every role, so small roles are not sampled away
+        before = len(kept)
+        order = kept.groupby(role_column, sort=False)["_rank"].rank(method="first")
+        sizes = kept.groupby(role_column, sort=False)["_rank"].transform("size")
+        kept = kept[order <= np.ceil(sizes * settings["sample_fraction"])]
+        report["sampled_out"] = before - len(kept)
+    if settings["max_per_role"]:
+        before = len(kept)
+        kept = (kept.sort_values("_rank", kind="stable").groupby(role_column, sort=False)
+                .head(settings["max_per_role"]).sort_index())
+        report["capped"] = before - len(kept)
+    kept = kept.drop(columns="_rank")
+
+    counts = pd.DataFrame({"input": df[role_column].astype(str).value_counts(),
+                           "output": kept[role_column].astype(str).value_counts()}).fillna(0).astype(int)
+    report["output"] = len(kept)
+    report["roles"] = {role: row.to_dict() for role, row in counts.sort_values("input", ascending=False).iterrows()}
+    return kept, report
+
+
+def print_report(report):
+    dropped = report["input"] - report["output"]
+    print(f"✅ Dedupe kept {report['output']} of {report['input']} records "
+          f"({dropped} dropped: {report['exact_duplicates']} exact, {report['near_duplicates']} near-duplicate, "
+          f"{report['sampled_out']} sampled out, {report['capped']} over the per-role cap)")
+    for role, counts in list(report["roles"].items())[:10]:
+        print(f"   {role}: {counts['output']}/{counts['input']}")
+
+
+def save_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    from log_store import read_logs
+
+    settings = dedupe_settings()
+    logs_df = read_logs("model_logs", columns=["timestamp", "resume_text"]).dropna().assign(true_role="unlabeled")
+    feedback_df = read_logs("user_feedback", columns=["timestamp", "resume_text", "true_role"]).dropna()
+    records = pd.concat([logs_df, feedback_df], ignore_index=True).sort_values("timestamp", kind="stable")
+    _, report = dedupe_records(records.reset_index(drop=True), settings=settings)
+    print_report(report)
+    save_report(report, settings["report_path"])
+    print(f"✅ Report saved to {settings['report_path']}")
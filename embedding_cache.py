@@ -0,0 +1,130 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+KEYS_FILE = "keys.json"
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(text, model_name):
+    return hashlib.sha1(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+
+class TextEmbeddingCache:
+    """Persistent per-text embedding cache keyed by content hash and model name.
+
+    Vectors live in one .npy matrix per model; keys.json maps row order to
+    text hashes. Only texts that are not already cached need encoding.
+    """
+
+    def __init__(self, path, model_name):
+        self.model_name = model_name
+        self.path = os.path.join(path, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self._rows = {}
+        self._vectors = None
+        self._new_vectors = []
+        self.hits = 0
+        self.misses = 0
+
+        keys_path = os.path.join(self.path, KEYS_FILE)
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        if os.path.exists(keys_path) and os.path.exists(vectors_path):
+            with open(keys_path, "r") as f:
+                keys = json.load(f)
+            vectors = np.load(vectors_path, mmap_mode="r")
+            if len(keys) == vectors.shape[0]:
+                self._rows = {key: i for i, key in enumerate(keys)}
+                self._vectors = vectors
+            else:
+                logger.warning(f"⚠️ Embedding cache at {self.path} is inconsistent, starting empty.")
+
+    def __len__(self):
+        return len(self._rows)
+
+    def missing(self, texts):
+        """Unique texts that have no cached vector yet, in first-seen order."""
+        seen = set()
+        missing = []
+        for text in texts:
+            key = text_key(text, self.model_name)
+            if key in self._rows or key in seen:
+                continue
+            seen.add(key)
+            missing.append(text)
+        return missing
+
+    def add(self, texts, vectors):
+        # texts must be unique and uncached, as returned by missing()
+        vectors = np.asarray(vectors, dtype=np.float32)
+        start = len(self._rows)
+        for offset, text in enumerate(texts):
+            self._rows[text_key(text, self.model_name)] = start + offset
+        self._new_vectors.append(vectors)
+        self.misses += len(texts)
+
+    def _base_rows(self):
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def _gather(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        base = self._base_rows()
+        from_base = rows < base
+        dim = self._vectors.shape[1] if self._vectors is not None else self._new_vectors[0].shape[1]
+        out = np.empty((len(rows), dim), dtype=np.float32)
+        if from_base.any():
+            out[from_base] = self._vectors[rows[from_base]]
+        if (~from_base).any():
+            new = np.concatenate(self._new_vectors) if len(self._new_vectors) > 1 else self._new_vectors[0]
+            self._new_vectors = [new]
+            out[~from_base] = new[rows[~from_base] - base]
+        return out
+
+    def lookup(self, texts):
+        """Return a (len(texts), dim) matrix; every text must already be cached."""
+        rows = [self._rows[text_key(text, self.model_name)] for text in texts]
+        base = self._base_rows()
+        self.hits += sum(1 for row in rows if row < base)
+        return self._gather(rows)
+
+    def encode(self, texts, model, batch_size=32):
+        missing = self.missing(texts)
+        if missing:
+            vectors = model.encode(missing, batch_size=batch_size, convert_to_numpy=True,
+                                   normalize_embeddings=True, show_progress_bar=False)
+            self.add(missing, vectors)
+        return self.lookup(texts)
+
+    def save(self, keep_texts=None):
+        """Persist the cache; with keep_texts, drop vectors for texts no longer in the corpus."""
+        keys = [None] * len(self)
+        for key, row in self._rows.items():
+            keys[row] = key
+        rows = list(range(len(keys)))
+        if keep_texts is not None:
+            keep = {text_key(text, self.model_name) for text in keep_texts}
+            rows = [row for row in rows if keys[row] in keep]
+        if not rows:
+            return 0
+
+        matrix = self._gather(rows)
+        kept_keys = [keys[row] for row in rows]
+
+        os.makedirs(self.path, exist_ok=True)
+        vectors_tmp = os.path.join(self.path, VECTORS_FILE + ".tmp")
+        keys_tmp = os.path.join(self.path, KEYS_FILE + ".tmp")
+        with open(vectors_tmp, "wb") as f:
+            np.save(f, matrix)
+        with open(keys_tmp, "w") as f:
+            json.dump(kept_keys, f)
+        os.replace(vectors_tmp, os.path.join(self.path, VECTORS_FILE))
+        os.replace(keys_tmp, os.path.join(self.path, KEYS_FILE))
+
+        self._vectors = np.load(os.path.join(self.path, VECTORS_FILE), mmap_mode="r")
+        self._rows = {key: i for i, key in enumerate(kept_keys)}
+        self._new_vectors = []
+        return len(kept_keys)
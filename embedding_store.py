@@ -0,0 +1,249 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+from role_index import as_normalized_matrix
+
+MATRIX_FILE = "embeddings.npy"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+FORMAT_VERSION = 1
+SUPPORTED_DTYPES = ("float32", "float16")
+
+RoleEmbeddings = namedtuple("RoleEmbeddings", ["embeddings", "roles", "manifest", "version", "path"])
+
+
+class EmbeddingStoreError(ValueError):
+    pass
+
+
+def content_hash(matrix, roles):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(matrix).tobytes())
+    digest.update(json.dumps(list(roles)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_embeddings(path, embeddings, roles, model_name, dtype="float32"):
+    """Write L2-normalised embeddings as a raw .npy matrix plus a JSON manifest."""
+    if dtype not in SUPPORTED_DTYPES:
+        raise EmbeddingStoreError(f"Unsupported embedding dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+    roles = [str(r) for r in roles]
+    matrix = np.ascontiguousarray(as_normalized_matrix(embeddings).astype(dtype))
+    if matrix.shape[0] != len(roles):
+        raise EmbeddingStoreError(f"{len(roles)} role labels for {matrix.shape[0]} embedding rows")
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "model_name": model_name,
+        "dtype": dtype,
+        "rows": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "normalized": True,
+        "sha256": content_hash(matrix, roles),
+        "created_at": datetime.now().isoformat(),
+        "roles": roles
+    }
+
+    os.makedirs(path, exist_ok=True)
+    # Write beside the final names and rename, so readers never map a half-written matrix
+    matrix_tmp = os.path.join(path, MATRIX_FILE + ".tmp")
+    manifest_tmp = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(matrix_tmp, "wb") as f:
+        np.save(f, matrix)
+    with open(manifest_tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(matrix_tmp, os.path.join(path, MATRIX_FILE))
+    os.replace(manifest_tmp, os.path.join(path, MANIFEST_FILE))
+    return manifest
+
+
+# ✅ Versioned layout: <path>/versions/<stamp>-<sha8>/ holds each store, <path>/CURRENT names the live one.
+# A flat store (matrix + manifest directly in <path>) is still read for stores written before versioning.
+
+def current_version(path):
+    """Name of the published version, or None for a flat (or missing) store. One small file read."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_store(path):
+    """Directory holding the live matrix: the version CURRENT points at, else ``path`` itself."""
+    name = current_version(path)
+    return os.path.join(path, VERSIONS_DIR, name) if name else path
+
+
+def stage_version(path, embeddings, roles, model_name, dtype="float32"):
+    """Write a complete new version under <path>/versions/ without making it live; returns its directory."""
+    versions = os.path.join(path, VERSIONS_DIR)
+    staging = os.path.join(versions, f".staging-{os.getpid()}-{datetime.now():%H%M%S%f}")
+    manifest = save_embeddings(staging, embeddings, roles, model_name, dtype=dtype)
+    version_path = os.path.join(versions, f"{datetime.now():%Y%m%dT%H%M%S%f}-{manifest['sha256'][:8]}")
+    os.rename(staging, version_path)
+    return version_path
+
+
+def publish_version(path, version_path, keep=3):
+    """Atomically point CURRENT at a staged version: readers see the old or the new store, never a mix.
+
+    Older versions beyond ``keep`` are deleted; processes that still map them keep
+    their (unlinked) files until they reload.
+    """
+    name = os.path.basename(os.path.normpath(version_path))
+    tmp = os.path.join(path, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(name + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, CURRENT_FILE))
+    # Flat files from before versioning are shadowed by CURRENT from now on
+    for legacy in (MATRIX_FILE, MANIFEST_FILE, "ann_ivf.npz"):
+        if os.path.exists(os.path.join(path, legacy)):
+            os.remove(os.path.join(path, legacy))
+    versions = sorted(v for v in os.listdir(os.path.join(path, VERSIONS_DIR)) if not v.startswith("."))
+    for old in versions[:-keep] if keep else []:
+        if old != name:
+            shutil.rmtree(os.path.join(path, VERSIONS_DIR, old), ignore_errors=True)
+    return name
+
+
+def publish_embeddings(path, embeddings, roles, model_name, dtype="float32", index_config=None, keep=3,
+                       lexical_texts=None):
+    """Stage a new version (plus its ANN index and lexical index, if given) and make it live in one step.
+
+    ``lexical_texts`` is a (roles, texts) pair the BM25 term-by-role matrix is built from.
+    """
+    version_path = stage_version(path, embeddings, roles, model_name, dtype=dtype)
+    if index_config is not None:
+        from ann_index import build_store_index
+        build_store_index(version_path, index_config)
+    if lexical_texts is not None:
+        from lexical_index import build_store_lexical
+        build_store_lexical(version_path, *lexical_texts)
+    publish_version(path, version_path, keep=keep)
+    return read_manifest(version_path)
+
+
+def read_manifest(path):
+    path = resolve_store(path)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise EmbeddingStoreError(f"No embedding manifest at {manifest_path}")
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def load_embeddings(path, mmap=True, verify_hash=False, expected_model=None):
+    """Memory-map the stored matrix and check it against its manifest.
+
+    The matrix is returned as a read-only memmap in its stored dtype with no copy,
+    float16 included (scoring widens it block by block), so every process shares
+    the same page-cache pages. ``path`` may be a versioned root (CURRENT is
+    resolved once, so matrix and manifest always match).
+    """
+    path = resolve_store(path)
+    manifest = read_manifest(path)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise EmbeddingStoreError(f"Unsupported embedding store format {manifest.get('format_version')}")
+    if expected_model and manifest["model_name"] != expected_model:
+        raise EmbeddingStoreError(
+            f"Embeddings were built with '{manifest['model_name']}', expected '{expected_model}'"
+        )
+
+    matrix = np.load(os.path.join(path, MATRIX_FILE), mmap_mode="r" if mmap else None)
+    expected_shape = (manifest["rows"], manifest["dim"])
+    if matrix.shape != expected_shape or str(matrix.dtype) != manifest["dtype"]:
+        raise EmbeddingStoreError(
+            f"Embedding matrix {matrix.shape}/{matrix.dtype} does not match manifest "
+            f"{expected_shape}/{manifest['dtype']}"
+        )
+    if len(manifest["roles"]) != manifest["rows"]:
+        raise EmbeddingStoreError("Manifest role labels do not match its row count")
+    if verify_hash and content_hash(matrix, manifest["roles"]) != manifest["sha256"]:
+        raise EmbeddingStoreError(f"Embedding matrix at {path} failed its content hash check")
+    return RoleEmbeddings(matrix, manifest["roles"], manifest, manifest["sha256"][:16], path)
+
+
+def role_prototypes(labels, vectors, per_role=4, method="kmeans", iters=10, seed=0):
+    """Up to ``per_role`` unit vectors per distinct label, from spherical k-means over that label's rows.
+
+    Prototypes come out in first-seen label order, largest cluster first. Labels with
+    no more rows than ``per_role`` keep their rows; ``method="medoid"`` replaces each
+    centroid with the real row nearest to it. ``per_role=1`` is the role mean and
+    ``per_role=0`` keeps every row.
+    """
+    import pandas as pd
+    from ann_index import spherical_kmeans
+    matrix = as_normalized_matrix(vectors)
+    if not per_role:
+        return [str(label) for label in labels], matrix
+    codes, role_labels = pd.factorize(pd.Series(labels))
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(role_labels) + 1))
+    prototype_labels, prototypes = [], []
+    for code, role in enumerate(role_labels):
+        rows = matrix[order[bounds[code]:bounds[code + 1]]]
+        centroids = rows
+        if len(rows) > per_role:
+            centroids, assignments = spherical_kmeans(rows, per_role, iters=iters, seed=seed)
+            sizes = np.bincount(assignments, minlength=len(centroids))
+            ranked = [c for c in np.argsort(-sizes, kind="stable") if sizes[c]]
+            centroids = centroids[ranked]
+            if method == "medoid":
+                centroids = rows[np.argmax(rows @ centroids.T, axis=0)]
+        prototype_labels += [str(role)] * len(centroids)
+        prototypes.append(centroids)
+    return prototype_labels, np.vstack(prototypes).astype(np.float32)
+
+
+def prototype_settings(config):
+    model_config = config["model"]
+    return {"per_role": int(model_config.get("prototypes_per_role", 0)),
+            "method": model_config.get("prototype_method", "kmeans")}
+
+
+def build_from_csv(path, model, model_name, csv_path="job_title_des_cleaned.csv", dtype="float32", batch_size=32,
+                   index_config=None, prototypes=None):
+    """Encode the postings in the role CSV and publish them (or per-role prototypes) as the live store."""
+    import pandas as pd
+    roles_df = pd.read_csv(csv_path).dropna(subset=["Job Title", "Cleaned_Description"])
+    embeddings = model.encode(
+        roles_df["Cleaned_Description"].tolist(),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    roles = roles_df["Job Title"].tolist()
+    lexical_texts = (roles, roles_df["Cleaned_Description"].tolist())
+    if prototypes:
+        roles, embeddings = role_prototypes(roles, embeddings, prototypes["per_role"], prototypes["method"])
+    return publish_embeddings(path, embeddings, roles, model_name, dtype=dtype, index_config=index_config,
+                              lexical_texts=lexical_texts)
+
+
+if __name__ == "__main__":
+    from config.load_config import load_config
+    from model_registry import get_base_model
+    from precision import embedding_dtype
+
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Build the role embedding store from the role CSV.")
+    parser.add_argument("--csv", default=config["paths"]["role_data_path"])
+    parser.add_argument("--out", default=config["paths"]["role_embeddings_path"])
+    parser.add_argument("--dtype", default=embedding_dtype(config))
+    args = parser.parse_args()
+
+    model_name = config["model"]["embedding_model_name"]
+    manifest = build_from_csv(args.out, get_base_model(), model_name, csv_path=args.csv, dtype=args.dtype,
+                              index_config=config.get("index", {}), prototypes=prototype_settings(config))
+    print(f"✅ Published {manifest['rows']} x {manifest['dim']} {manifest['dtype']} embeddings "
+          f"as {args.out}/{VERSIONS_DIR}/{current_version(args.out)}")
@@ -1,77 +1,379 @@
-import pandas as pd
+import os
+import json
+import hashlib
 import numpy as np
-import matplotlib.pyplot as plt
-from sentence_transformers import util, SentenceTransformer
-from model_utils import clean_text, roles, role_embeddings
+import pandas as pd
 from difflib import get_close_matches
 from config.load_config import load_config
-import os, json
+from role_index import as_normalized_matrix
+from chunking import POOLINGS, chunk_settings, chunking_signature
+from lexical_index import LexicalIndex, lexical_settings, lexical_signature
+
+EVAL_CACHE_DIR = "artifacts/evaluation_cache"
+
+# ✅ In-process memo: {(embeddings_version, csv_hash, top_k, reduction, search, precision): (accuracy, similarity_scores_list)}
+_results_cache = {}
+_embeddings_version = (None, None)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def embeddings_version(role_embeddings):
+    # Hashing the matrix is cheap next to encoding, but still only do it once per object
+    global _embeddings_version
+    cached_id, version = _embeddings_version
+    if cached_id == id(role_embeddings) and version:
+        return version
+    matrix = np.ascontiguousarray(as_normalized_matrix(role_embeddings))
+    version = hashlib.sha1(matrix.tobytes()).hexdigest()[:16]
+    _embeddings_version = (id(role_embeddings), version)
+    return version
+
+
+def _is_match(true_role, predicted_roles):
+    true_role = true_role.strip().lower()
+    predicted = [r.strip().lower() for r in predicted_roles]
+    if true_role in predicted:
+        return True
+    return bool(get_close_matches(true_role, predicted, n=1, cutoff=0.8))
+
+
+def _load_cached(key):
+    if key in _results_cache:
+        return _results_cache[key]
+    path = os.path.join(EVAL_CACHE_DIR, f"{'_'.join(map(str, key))}.json")
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            cached = json.load(f)
+        result = (cached["accuracy"], cached["similarity_scores_list"])
+        _results_cache[key] = result
+        return result
+    return None
+
+
+def _store_cached(key, result):
+    _results_cache[key] = result
+    os.makedirs(EVAL_CACHE_DIR, exist_ok=True)
+    path = os.path.join(EVAL_CACHE_DIR, f"{'_'.join(map(str, key))}.json")
+    with open(path, "w") as f:
+        json.dump({"accuracy": result[0], "similarity_scores_list": result[1]}, f)
+
 
-# Load updated evaluation dataset
-df = pd.read_csv("Sample_Evaluation_Data.csv")
-print(df.head())
-print(f"✅ Loaded {len(df)} evaluation samples.")
+def evaluate_model(model_path="Sample_Evaluation_Data.csv", top_k=3, model=None,
+                   roles=None, role_embeddings=None, batch_size=32, use_cache=True, model_tag=None,
+                   chunking=None):
+    import model_utils
+    import model_registry
+    from precision import precision_settings
+    if (roles is None) != (role_embeddings is None):
+        raise ValueError("roles and role_embeddings must be given together")
+    if model_tag is None:
+        model_tag = model_registry.active_precision() if model is None else getattr(model, "precision", "fp32")
+    ungated = model_tag is None
+    if ungated:
+        # Accuracy gate not run yet: key on the configured model rather than loading it just for the key
+        settings = precision_settings()
+        model_tag = f"{os.path.basename(settings['model_name'])}-{settings['precision']}"
+    if role_embeddings is None:
+        role_data = model_utils.get_role_data()
+        roles, role_embeddings, version = role_data.roles, role_data.embeddings, role_data.version
+    else:
+        version = embeddings_version(role_embeddings)
 
-def evaluate_model(model_path="Sample_Evaluation_Data.csv", top_k=3):
-    model = SentenceTransformer('all-mpnet-base-v2',device="cpu")
+    role_index = model_utils.get_role_index(roles, role_embeddings)
+    search = role_index.ann.kind if role_index.ann is not None else "exact"
+    chunking = model_utils.CHUNKING if chunking is None else chunking
+    key_parts = (version, file_hash(model_path)[:16], top_k, role_index.reduction, search)
+    key_suffix = (chunking_signature(chunking), lexical_signature(role_index.lexical_weight))
+    key = key_parts + (model_tag,) + key_suffix
+    if use_cache:
+        cached = _load_cached(key)
+        if cached is not None:
+            return cached
+
+    model = model_utils.get_model() if model is None else model
+    if ungated:
+        # Loading the model ran the gate: store under the precision it actually chose
+        key = key_parts + (getattr(model, "precision", "fp32"),) + key_suffix
     df = pd.read_csv(model_path)
 
+    # ✅ One batched encode + one matrix product for the whole evaluation set
+    cleaned = [model_utils.clean_text(text) for text in df["resume_text"].astype(str)]
+    resume_embeddings = model_utils.encode_documents(cleaned, model, batch_size=batch_size, settings=chunking,
+                                                     role_index=role_index)
+    lexical_queries = None
+    if role_index.lexical is not None and role_index.lexical_weight:
+        lexical_queries = role_index.lexical.query_matrix(df["resume_text"].astype(str))
+    top_indices, top_scores = role_index.top_k(resume_embeddings, top_k, lexical_queries=lexical_queries)
+    if lexical_queries is not None:
+        # Fused scores are not cosines: the similarity metric stays the best dense match
+        _, top_scores = role_index.top_k(resume_embeddings, 1)
+    similarity_scores_list = [float(s) for s in top_scores[:, 0]]
+
     correct = 0
-    similarity_scores_list = []
+    for true_role, role_ids in zip(df["true_role"].astype(str), top_indices):
+        top_roles = [role_index.labels[idx] for idx in role_ids]
+        if _is_match(true_role, top_roles):
+            correct += 1
 
-    for i, row in df.iterrows():
-        cleaned = clean_text(row['resume_text'])
-        embedding = model.encode(cleaned, convert_to_tensor=True)
-        similarity_scores = util.cos_sim(embedding, role_embeddings)[0].cpu().numpy()
-        similarity_scores_list.append(similarity_scores.max())
+    result = (correct / len(df), similarity_scores_list)
+    if use_cache:
+        _store_cached(key, result)
+    return result
 
-        top_indices = np.argsort(similarity_scores)[::-1][:top_k]
-       
-        top_roles = [roles[idx] for idx in top_indices if idx < len(roles)]
 
+def evaluate_index_recall(model_path="Sample_Evaluation_Data.csv", k=10, index=None, batch_size=32):
+    """recall@k and per-query latency of the ANN index against exact search on the evaluation resumes.
 
-        true_role = row['true_role'].strip().lower()
-        predicted_roles_cleaned = [r.strip().lower() for r in top_roles]
+    Uses the serving ANN index when one is loaded, otherwise builds an IVF index in memory to measure.
+    """
+    import time
+    import model_utils
+    from ann_index import ExactIndex, IVFIndex, recall_at_k
 
-        if true_role in predicted_roles_cleaned:
-            print("✅ MATCHED!")
-            correct += 1
-        else:
-            match = get_close_matches(true_role, predicted_roles_cleaned, n=1, cutoff=0.8)
-            if match:
-                print(f"🔶 Fuzzy Match Found: {match[0]}")
-                correct += 1
-            else:
-                print("❌ Not Matched.")
-
-    accuracy = correct / len(df)
-    return accuracy, similarity_scores_list
-
-# Run evaluation
-accuracy, similarity_scores_list = evaluate_model()
-print("🎯 Top-3 Accuracy:", round(accuracy, 4))
-
-# Save metrics
-config = load_config()
-metrics_output_path = config["evaluation"]["metrics_output_path"]
-
-metrics = {
-    "top_3_accuracy": round(float(accuracy), 4),
-    "average_max_similarity_score": round(float(np.mean(similarity_scores_list)), 4)
-}
-
-os.makedirs(os.path.dirname(metrics_output_path), exist_ok=True)
-with open(metrics_output_path, "w") as f:
-    json.dump(metrics, f, indent=2)
-
-print(f"✅ Metrics saved to: {metrics_output_path}")
-
-# Plot
-plt.figure(figsize=(8, 5))
-plt.hist(similarity_scores_list, bins=10, color="skyblue", edgecolor="black")
-plt.title("Distribution of Max Similarity Scores")
-plt.xlabel("Cosine Similarity")
-plt.ylabel("Frequency")
-plt.grid(True)
-plt.tight_layout()
-plt.show()
+    role_data = model_utils.get_role_data()
+    exact = ExactIndex(role_data.embeddings)
+    index = index or role_data.index.ann
+    if index is None:
+        index_config = load_config().get("index", {})
+        index = IVFIndex.build(role_data.embeddings, nlist=index_config.get("nlist", 0),
+                               nprobe=index_config.get("nprobe", 8))
+
+    df = pd.read_csv(model_path)
+    cleaned = [model_utils.clean_text(text) for text in df["resume_text"].astype(str)]
+    queries = model_utils.encode_texts(cleaned, model_utils.get_model(), batch_size=batch_size)
+
+    timings = {}
+    for name, candidate in (("exact", exact), ("ann", index)):
+        started = time.perf_counter()
+        for query in queries:
+            candidate.search(query[None, :], k)
+        timings[name] = (time.perf_counter() - started) * 1000 / len(queries)
+
+    return {
+        "kind": index.kind,
+        "k": k,
+        "recall": recall_at_k(index, exact, queries, k),
+        "exact_ms": timings["exact"],
+        "ann_ms": timings["ann"]
+    }
+
+
+def evaluate_prototypes(model_path="Sample_Evaluation_Data.csv", ks=(1, 2, 4, 8, 0), method=None, top_k=3,
+                        batch_size=32, repeat=20):
+    """Top-k accuracy, scoring latency and matrix size for each prototypes_per_role value.
+
+    Postings and feedback are encoded once (through the retrain embedding cache) and the
+    evaluation resumes once; each k then only re-clusters and re-scores. k=0 is the
+    one-row-per-posting matrix.
+    """
+    import time
+    import model_utils
+    from embedding_cache import TextEmbeddingCache
+    from embedding_store import role_prototypes, prototype_settings
+    from role_index import RoleIndex
+
+    config = load_config()
+    method = method or prototype_settings(config)["method"]
+    roles, descriptions = model_utils.load_role_training_texts(config)
+    cache = TextEmbeddingCache(config["paths"].get("embedding_cache_path", "artifacts/embedding_cache"),
+                               config["model"]["embedding_model_name"])
+    vectors = cache.encode([str(d) for d in descriptions], model_utils.get_base_model(), batch_size=batch_size)
+    cache.save()
+
+    df = pd.read_csv(model_path)
+    cleaned = [model_utils.clean_text(text) for text in df["resume_text"].astype(str)]
+    queries = model_utils.encode_texts(cleaned, model_utils.get_model(), batch_size=batch_size)
+
+    report = []
+    for k in ks:
+        started = time.perf_counter()
+        labels, matrix = role_prototypes(roles, vectors, k, method)
+        build_seconds = time.perf_counter() - started
+        index = RoleIndex(labels, matrix, reduction=config["model"].get("role_reduction", "max"),
+                          top_m=config["model"].get("role_top_m", 3), normalized=True)
+        top_indices, _ = index.top_k(queries, top_k)
+        correct = sum(_is_match(true_role, [index.labels[i] for i in ids])
+                      for true_role, ids in zip(df["true_role"].astype(str), top_indices))
+        # Serving scores one resume at a time, so time single-query calls
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                index.top_k(query[None, :], top_k)
+        report.append({
+            "prototypes_per_role": k,
+            "rows": int(matrix.shape[0]),
+            "matrix_mb": round(matrix.nbytes / 1e6, 3),
+            "accuracy": round(correct / len(df), 4),
+            "ms_per_query": round((time.perf_counter() - started) * 1000 / (repeat * len(queries)), 4),
+            "build_seconds": round(build_seconds, 3)
+        })
+    return report
+
+
+def evaluate_lexical(model_path="Sample_Evaluation_Data.csv", weights=(0.0, 0.1, 0.2, 0.3, 0.5, 1.0), top_k=3,
+                     batch_size=32):
+    """Top-k accuracy for each lexical.weight (0 is dense only, 1 lexical only).
+
+    The BM25 index is built in memory from the same postings and feedback as the
+    store; dense scores are computed once and each weight only re-fuses.
+    """
+    import time
+    import model_utils
+
+    config = load_config()
+    settings = lexical_settings(config)
+    roles, descriptions = model_utils.load_role_training_texts(config)
+    role_index = model_utils.get_role_index()
+    started = time.perf_counter()
+    lexical = LexicalIndex.build(roles, descriptions, settings["k1"], settings["b"], settings["max_role_share"],
+                                 settings["max_chars"]).aligned(role_index.labels)
+    build_seconds = time.perf_counter() - started
+
+    df = pd.read_csv(model_path)
+    texts = df["resume_text"].astype(str).tolist()
+    cleaned = [model_utils.clean_text(text) for text in texts]
+    dense = role_index.role_scores(model_utils.encode_texts(cleaned, model_utils.get_model(), batch_size=batch_size))
+    started = time.perf_counter()
+    sparse = lexical.scores(lexical.query_matrix(texts, settings["max_chars"]))
+    lexical_ms = (time.perf_counter() - started) * 1000 / len(texts)
+
+    report = []
+    for weight in weights:
+        fused = (1 - weight) * dense + weight * sparse
+        top_indices = np.argsort(-fused, axis=1)[:, :top_k]
+        correct = sum(_is_match(true_role, [role_index.labels[i] for i in ids])
+                      for true_role, ids in zip(df["true_role"].astype(str), top_indices))
+        report.append({
+            "weight": weight,
+            "accuracy": round(correct / len(df), 4),
+            "lexical_ms_per_resume": round(lexical_ms, 4),
+            "terms": len(lexical.terms),
+            "build_seconds": round(build_seconds, 3)
+        })
+    return report
+
+
+# Role-neutral resume boilerplate used to push the real content past the encoder's token limit
+LONG_RESUME_FILLER = (
+    "References available upon request. Education: bachelor's degree, coursework and honors. "
+    "Contact details, address, phone number and email. Interests include travel, reading, hiking. "
+    "Volunteer work, community events, languages spoken, availability and work authorization. "
+)
+
+
+def evaluate_chunking(model_path="Sample_Evaluation_Data.csv", pad_tokens=600, poolings=POOLINGS, batch_size=32):
+    """Top-3 accuracy and encode latency for each chunk pooling mode.
+
+    Runs on the evaluation set as-is and on a long-document variant in which each resume
+    follows ~pad_tokens tokens of boilerplate, the case single-pass truncation gets wrong.
+    """
+    import time
+    import tempfile
+    import model_utils
+
+    model = model_utils.get_model()
+    df = pd.read_csv(model_path)
+    filler = (LONG_RESUME_FILLER * (pad_tokens // 40 + 1))
+    filler_ids = model.tokenizer(filler, add_special_tokens=False, verbose=False)["input_ids"][:pad_tokens]
+    filler = model.tokenizer.decode(filler_ids)
+    long_df = df.assign(resume_text=filler + " " + df["resume_text"].astype(str))
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+        long_df.to_csv(f, index=False)
+        long_path = f.name
+
+    report = []
+    try:
+        for pooling in poolings:
+            settings = {**chunk_settings(), "pooling": pooling}
+            accuracy, _ = evaluate_model(model_path, model=model, use_cache=False, chunking=settings,
+                                         batch_size=batch_size)
+            started = time.perf_counter()
+            long_accuracy, _ = evaluate_model(long_path, model=model, use_cache=False, chunking=settings,
+                                              batch_size=batch_size)
+            report.append({
+                "pooling": pooling,
+                "signature": chunking_signature(settings),
+                "accuracy": round(float(accuracy), 4),
+                "long_accuracy": round(float(long_accuracy), 4),
+                "long_ms_per_resume": round((time.perf_counter() - started) * 1000 / len(df), 3),
+                "max_chunks": settings["max_chunks"] if pooling != "off" else 1
+            })
+    finally:
+        os.remove(long_path)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import matplotlib.pyplot as plt
+
+    parser = argparse.ArgumentParser(description="Evaluate top-3 accuracy on the sample evaluation set.")
+    parser.add_argument("--prototypes", default=None,
+                        help="comma-separated prototypes_per_role values to compare, e.g. 1,2,4,8,0")
+    parser.add_argument("--lexical-weights", default=None,
+                        help="comma-separated lexical.weight values to compare, e.g. 0,0.1,0.3,0.5,1")
+    args = parser.parse_args()
+
+    accuracy, similarity_scores_list = evaluate_model()
+    print(f"✅ Evaluated {len(similarity_scores_list)} samples.")
+    print("🎯 Top-3 Accuracy:", round(accuracy, 4))
+
+    # Save metrics
+    config = load_config()
+    metrics_output_path = config["evaluation"]["metrics_output_path"]
+
+    metrics = {
+        "top_3_accuracy": round(float(accuracy), 4),
+        "average_max_similarity_score": round(float(np.mean(similarity_scores_list)), 4)
+    }
+
+    os.makedirs(os.path.dirname(metrics_output_path), exist_ok=True)
+    with open(metrics_output_path, "w") as f:
+        json.dump(metrics, f, indent=2)
+
+    print(f"✅ Metrics saved to: {metrics_output_path}")
+
+    if config.get("index", {}).get("type", "exact") != "exact":
+        report = evaluate_index_recall()
+        print(f"🎯 {report['kind']} recall@{report['k']}: {report['recall']:.4f} "
+              f"({report['ann_ms']:.3f} ms/query vs exact {report['exact_ms']:.3f} ms/query)")
+
+    if args.prototypes:
+        # Accuracy / latency / size trade-off of model.prototypes_per_role
+        report = evaluate_prototypes(ks=[int(k) for k in args.prototypes.split(",")])
+        print(f"{'k':>4}{'rows':>8}{'MB':>9}{'accuracy':>10}{'ms/query':>10}")
+        for row in report:
+            print(f"{row['prototypes_per_role']:>4}{row['rows']:>8}{row['matrix_mb']:>9.3f}"
+                  f"{row['accuracy']:>10.3f}{row['ms_per_query']:>10.4f}")
+        prototype_report_path = os.path.join(os.path.dirname(metrics_output_path), "prototype_report.json")
+        with open(prototype_report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Prototype report saved to: {prototype_report_path}")
+
+    if args.lexical_weights:
+        # Accuracy of dense / BM25 score fusion at each lexical.weight
+        report = evaluate_lexical(weights=[float(w) for w in args.lexical_weights.split(",")])
+        print(f"{'weight':>8}{'accuracy':>10}{'lexical ms':>12}")
+        for row in report:
+            print(f"{row['weight']:>8g}{row['accuracy']:>10.3f}{row['lexical_ms_per_resume']:>12.4f}")
+        lexical_report_path = os.path.join(os.path.dirname(metrics_output_path), "lexical_report.json")
+        with open(lexical_report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Lexical report saved to: {lexical_report_path}")
+
+    # Plot
+    plt.figure(figsize=(8, 5))
+    plt.hist(similarity_scores_list, bins=10, color="skyblue", edgecolor="black")
+    plt.title("Distribution of Max Similarity Scores")
+    plt.xlabel("Cosine Similarity")
+    plt.ylabel("Frequency")
+    plt.grid(True)
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,189 @@
+import os
+import io
+import re
+import time
+import zipfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from xml.etree.ElementTree import iterparse
+import fitz
+from config.load_config import load_config
+
+SUPPORTED_TYPES = (".pdf", ".docx")
+WORD = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DOCX_PARTS = (re.compile(r"word/header[0-9]*\.xml"), re.compile(r"word/document\.xml"),
+              re.compile(r"word/footer[0-9]*\.xml"))
+
+ExtractionResult = namedtuple("ExtractionResult", ["text", "file_type", "pages", "chars", "truncated", "seconds"])
+
+
+class ExtractionError(ValueError):
+    pass
+
+
+def extraction_limits():
+    limits = load_config().get("extraction", {})
+    return {
+        "max_pages": limits.get("max_pages", 30),
+        "max_bytes": int(limits.get("max_mb", 10) * 1024 * 1024),
+        "max_chars": limits.get("max_chars", 30000),
+        "max_seconds": limits.get("max_seconds", 10),
+        "parallel_min_pages": limits.get("parallel_min_pages", 16),
+        "workers": limits.get("workers", 4)
+    }
+
+
+def _source_info(source):
+    """(name, size, pdf_input, docx_input) without copying the document bytes."""
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        return path, os.path.getsize(path), {"filename": path}, path
+    name = getattr(source, "name", "")
+    if hasattr(source, "getbuffer"):
+        source.seek(0)
+        buffer = source.getbuffer()
+        return name, buffer.nbytes, {"stream": buffer, "filetype": "pdf"}, source
+    if isinstance(name, str) and os.path.exists(name):
+        return name, os.path.getsize(name), {"filename": name}, name
+    data = source.read()
+    return name, len(data), {"stream": data, "filetype": "pdf"}, io.BytesIO(data)
+
+
+def _pdf_page_range(pdf_input, start, stop):
+    with fitz.open(**pdf_input) as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+_page_pool = None
+_page_pool_lock = threading.Lock()
+
+def _get_page_pool(workers):
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(max_workers=workers)
+        return _page_pool
+
+
+def _discard_page_pool(pool):
+    # Running page ranges cannot be cancelled: drop the pool so workers exit once they finish
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is pool:
+            _page_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_pdf_parallel(pdf_input, page_count, limits, started):
+    """Page ranges on worker processes, collected in order under one deadline for the whole document."""
+    workers = max(1, limits["workers"])
+    step = -(-page_count // workers)
+    pool = _get_page_pool(workers)
+    futures = [pool.submit(_pdf_page_range, pdf_input, start, min(start + step, page_count))
+               for start in range(0, page_count, step)]
+    parts, chars, pages = [], 0, 0
+    for future in futures:
+        remaining = limits["max_seconds"] - (time.perf_counter() - started)
+        try:
+            texts = future.result(timeout=max(remaining, 0))
+        except FutureTimeout:
+            _discard_page_pool(pool)
+            if not parts:
+                raise ExtractionError(f"PDF extraction exceeded the {limits['max_seconds']}s time budget.")
+            return "".join(parts), pages, True
+        for text in texts:
+            parts.append(text)
+            chars += len(text)
+            pages += 1
+            if chars >= limits["max_chars"]:
+                # Enough text: later ranges are not needed
+                for pending in futures:
+                    pending.cancel()
+                return "".join(parts), pages, pages < page_count
+    return "".join(parts), pages, False
+
+
+def _extract_pdf(pdf_input, limits, parallel, started):
+    with fitz.open(**pdf_input) as doc:
+        page_count = min(doc.page_count, limits["max_pages"])
+        truncated = doc.page_count > page_count
+
+        # Large PDFs on disk: fan page ranges out to worker processes, each opening the file itself.
+        # In-memory uploads stay sequential: every range would otherwise pickle a copy of the bytes.
+        if parallel and page_count >= limits["parallel_min_pages"] and "filename" in pdf_input:
+            text, pages, cut = _extract_pdf_parallel(pdf_input, page_count, limits, started)
+            return text, pages, truncated or cut
+
+        parts, chars = [], 0
+        for i in range(page_count):
+            text = doc[i].get_text()
+            parts.append(text)
+            chars += len(text)
+            # Early stop: enough text for the encoder, or over the time budget
+            if chars >= limits["max_chars"] or time.perf_counter() - started > limits["max_seconds"]:
+                truncated = truncated or i + 1 < doc.page_count
+                return "".join(parts), i + 1, truncated
+        return "".join(parts), page_count, truncated
+
+
+def _extract_docx(docx_input, limits, started):
+    """Header, body and footer text (as docx2txt lays it out), streamed under the char and time limits."""
+    parts, chars = [], 0
+    with zipfile.ZipFile(docx_input) as archive:
+        names = archive.namelist()
+        for pattern in DOCX_PARTS:
+            for name in filter(pattern.fullmatch, names):
+                with archive.open(name) as xml:
+                    for event, element in iterparse(xml, events=("start", "end")):
+                        tag = element.tag
+                        if event == "start":
+                            if tag == WORD + "p":
+                                parts.append("\n\n")
+                            elif tag == WORD + "tab":
+                                parts.append("\t")
+                            elif tag in (WORD + "br", WORD + "cr"):
+                                parts.append("\n")
+                            continue
+                        if tag == WORD + "t" and element.text:
+                            parts.append(element.text)
+                            chars += len(element.text)
+                        elif tag == WORD + "p":
+                            element.clear()
+                            # Early stop: enough text for the encoder, or over the time budget
+                            if chars >= limits["max_chars"] or time.perf_counter() - started > limits["max_seconds"]:
+                                return "".join(parts).strip(), 1, True
+    return "".join(parts).strip(), 1, False
+
+
+def extract_resume(source, parallel=True, **overrides):
+    """Extract text from a PDF/DOCX path or file-like object under page/byte/char/time limits.
+
+    Raises ExtractionError for unsupported, oversized or empty documents.
+    """
+    started = time.perf_counter()
+    limits = {**extraction_limits(), **overrides}
+    name, size, pdf_input, docx_input = _source_info(source)
+    file_type = os.path.splitext(str(name))[1].lower()
+
+    if file_type not in SUPPORTED_TYPES:
+        raise ExtractionError(f"Unsupported file type '{file_type or name}'. Please upload a PDF or DOCX.")
+    if size > limits["max_bytes"]:
+        raise ExtractionError(f"File is {size / 1e6:.1f} MB, over the {limits['max_bytes'] / 1e6:.0f} MB limit.")
+
+    try:
+        if file_type == ".pdf":
+            text, pages, truncated = _extract_pdf(pdf_input, limits, parallel, started)
+        else:
+            text, pages, truncated = _extract_docx(docx_input, limits, started)
+    except ExtractionError:
+        raise
+    except Exception as e:
+        raise ExtractionError(f"Could not read {file_type[1:].upper()} file: {e}") from e
+
+    if len(text) > limits["max_chars"]:
+        text, truncated = text[:limits["max_chars"]], True
+    if not text.strip():
+        raise ExtractionError("No text could be extracted (scanned or empty document?).")
+
+    return ExtractionResult(text, file_type, pages, len(text), truncated, round(time.perf_counter() - started, 4))
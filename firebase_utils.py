@@ -2,6 +2,20 @@ import firebase_admin
 from firebase_admin import credentials, db
 from datetime import datetime
 import os
+import json
+import time
+import logging
+import queue
+import atexit
+import random
+import threading
+from instrumentation import span, inc
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: spool works, just without cross-process locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
 
 # ✅ Smart initialize Firebase: works for Streamlit, GitHub Actions, local
 def initialize_firebase():
@@ -9,7 +23,6 @@ def initialize_firebase():
         try:
             if "firebase_key" in os.environ:
                 # Running in GitHub Actions or local (from .env or secrets)
-                import json
                 cred_json = os.environ["firebase_key"]
                 cred_dict = json.loads(cred_json)
                 cred = credentials.Certificate(cred_dict)
@@ -17,45 +30,327 @@ def initialize_firebase():
                 # Running inside Streamlit
                 import streamlit as st
                 cred = credentials.Certificate(dict(st.secrets["firebase_key"]))
-            
+
             firebase_admin.initialize_app(cred, {
                 'databaseURL': 'https://resume-role-recommender-default-rtdb.firebaseio.com/'
             })
-            print("✅ Firebase app initialized successfully!")
-        
+            logger.info("✅ Firebase app initialized successfully!")
+
+        except Exception as e:
+            logger.warning(f"⚠️ Error initializing Firebase app: {e}")
+
+# ✅ Client-side push keys (same alphabet/ordering as Firebase push IDs), so batched
+# multi-path writes keep chronological key order without a round trip per record
+PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_rand_chars = [0] * 12
+
+def generate_push_key():
+    global _last_push_time
+    with _push_lock:
+        now = int(time.time() * 1000)
+        duplicate_time = now == _last_push_time
+        _last_push_time = now
+
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(PUSH_CHARS[now % 64])
+            now //= 64
+        key = "".join(reversed(time_chars))
+
+        if not duplicate_time:
+            for i in range(12):
+                _last_rand_chars[i] = random.randrange(64)
+        else:
+            # Same millisecond: increment the random suffix so keys stay strictly ordered
+            i = 11
+            while i >= 0 and _last_rand_chars[i] == 63:
+                _last_rand_chars[i] = 0
+                i -= 1
+            _last_rand_chars[i] += 1
+        return key + "".join(PUSH_CHARS[c] for c in _last_rand_chars)
+
+def push_key_millis(key):
+    """Creation time (ms since epoch) encoded in the first 8 characters of a push key."""
+    millis = 0
+    for c in key[:8]:
+        millis = millis * 64 + PUSH_CHARS.index(c)
+    return millis
+
+
+class LocalReference:
+    """In-memory stand-in for the parts of ``db.Reference`` the sync and uploader use.
+
+    Supports ``child``/``get``/``update`` plus ``order_by_key().start_at().limit_to_first().get()``
+    over a plain dict (e.g. a Firebase JSON export), so sync runs can be tried offline.
+    """
+
+    def __init__(self, data=None, path="/"):
+        self.data = {} if data is None else data
+        self.path = path.strip("/")
+        self._start = None
+        self._limit = None
+
+    def _node(self, create=False):
+        node = self.data
+        for part in filter(None, self.path.split("/")):
+            if part not in node and create:
+                node[part] = {}
+            node = node.get(part, {}) if isinstance(node, dict) else {}
+        return node
+
+    def child(self, path):
+        return type(self)(self.data, f"{self.path}/{path}")
+
+    def order_by_key(self):
+        return type(self)(self.data, self.path)
+
+    def start_at(self, key):
+        self._start = key
+        return self
+
+    def limit_to_first(self, limit):
+        self._limit = limit
+        return self
+
+    def get(self):
+        node = self._node()
+        if not isinstance(node, dict):
+            return node
+        keys = sorted(k for k in node if self._start is None or k >= self._start)
+        if self._limit is not None:
+            keys = keys[:self._limit]
+        return {k: node[k] for k in keys} or None
+
+    def update(self, values):
+        for path, value in values.items():
+            parent, _, leaf = f"{self.path}/{path}".strip("/").rpartition("/")
+            LocalReference(self.data, parent)._node(create=True)[leaf] = value
+
+
+class BackgroundUploader:
+    """Queue of Firebase records drained by a worker thread into multi-path batch updates.
+
+    Records that cannot be sent (queue full, Firebase down, process exiting)
+    are appended to a JSONL spool and retried later. ``reference_factory``
+    defaults to ``firebase_admin.db.reference``; any callable returning an
+    object with ``update(dict)`` works, which is how tests use a local fake.
+    """
+
+    def __init__(self, reference_factory=None, spool_path="logs/firebase_spool.jsonl", max_queue=1000,
+                 max_batch=50, flush_interval=1.0, retry_interval=30.0, block_timeout=0.05):
+        self.reference_factory = reference_factory or db.reference
+        self.spool_path = spool_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.block_timeout = block_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._spool_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._thread = None
+        self.sent = 0
+        self.spooled = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="firebase-uploader", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, node, record):
+        item = (node, generate_push_key(), record)
+        try:
+            # Backpressure: wait briefly for room, then spill to disk instead of growing memory
+            self._queue.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            self._spool([item])
+        return item[1]
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        updates = {f"{node}/{key}": record for node, key, record in batch}
+        with span("firebase_upload"):
+            self.reference_factory("/").update(updates)
+        self.sent += len(batch)
+        inc("firebase_records_total", len(batch), outcome="sent")
+
+    def _send_or_spool(self, batch):
+        if time.monotonic() < self._retry_at:
+            self._spool(batch)
+            return False
+        try:
+            self._send(batch)
+            return True
         except Exception as e:
-            print(f"⚠️ Error initializing Firebase app: {e}")
+            logger.warning(f"⚠️ Firebase batch upload failed, spooling {len(batch)} records: {e}")
+            self._retry_at = time.monotonic() + self.retry_interval
+            self._spool(batch)
+            return False
+
+    def _locked(self, f):
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _append_spool(self, batch):
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        while True:
+            with self._spool_lock, open(self.spool_path, "a", encoding="utf-8") as f:
+                self._locked(f)
+                # A replay may have renamed the file while we waited for the lock: write to the new spool
+                try:
+                    current = os.fstat(f.fileno()).st_ino == os.stat(self.spool_path).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    for node, key, record in batch:
+                        f.write(json.dumps({"node": node, "key": key, "record": record}) + "\n")
+                    return
+
+    def _spool(self, batch):
+        self._append_spool(batch)
+        self.spooled += len(batch)
+        inc("firebase_records_total", len(batch), outcome="spooled")
+
+    @property
+    def replay_path(self):
+        return self.spool_path + ".replaying"
+
+    def _read_replay(self):
+        items = []
+        with open(self.replay_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    items.append((entry["node"], entry["key"], entry["record"]))
+                except (ValueError, KeyError):
+                    continue  # torn line from a crash mid-write
+        return items
+
+    def _write_replay(self, items):
+        tmp = f"{self.replay_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for node, key, record in items:
+                f.write(json.dumps({"node": node, "key": key, "record": record}) + "\n")
+        os.replace(tmp, self.replay_path)
 
-# ✅ Upload model log to Firebase
+    def _drain_spool(self):
+        """Replay spooled records; they stay on disk until Firebase has acknowledged them.
+
+        The spool is renamed to ``<spool>.replaying`` under the lock (new records start a
+        fresh spool) and sent from that file with no lock held, so submit() never waits on
+        the network. The file is deleted after the last batch is acknowledged; on failure
+        it is rewritten with the unsent records. A leftover file from a crash is replayed
+        first. Records are written under their push keys, so resending one is harmless.
+        """
+        if time.monotonic() < self._retry_at:
+            return
+        if not os.path.exists(self.replay_path):
+            if not os.path.exists(self.spool_path) or os.path.getsize(self.spool_path) == 0:
+                return
+            with self._spool_lock, open(self.spool_path, "a", encoding="utf-8") as f:
+                self._locked(f)
+                os.replace(self.spool_path, self.replay_path)
+        try:
+            items = self._read_replay()
+        except FileNotFoundError:
+            return  # another process finished replaying it
+        sent = 0
+        try:
+            for start in range(0, len(items), self.max_batch):
+                self._send(items[start:start + self.max_batch])
+                sent = min(start + self.max_batch, len(items))
+        except Exception as e:
+            logger.warning(f"⚠️ Firebase spool replay failed, will retry: {e}")
+            self._retry_at = time.monotonic() + self.retry_interval
+            self._write_replay(items[sent:])
+        else:
+            try:
+                os.remove(self.replay_path)
+            except FileNotFoundError:
+                pass
+        if sent:
+            logger.info(f"✅ Replayed {sent} spooled records to Firebase.")
+
+    def _run(self):
+        self._drain_spool()
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send_or_spool(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            self._drain_spool()
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far has been sent or spooled."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+
+    def close(self, timeout=5.0):
+        self.flush(timeout)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+        # Anything still in memory goes to the spool so a restart can resend it
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        if leftover:
+            self._spool(leftover)
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+def get_uploader():
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = BackgroundUploader().start()
+            atexit.register(_uploader.close)
+        return _uploader
+
+# ✅ Queue model log for Firebase (returns immediately; uploaded in the background)
 def upload_model_log(resume_text, predicted_roles, confidence_scores, resume_keywords):
-    try:
-        ref = db.reference("model_logs")
-        log_data = {
-            "timestamp": datetime.now().isoformat(),
-            "resume_text": resume_text,
-            "predicted_roles": predicted_roles,
-            "confidence_scores": confidence_scores,
-            "resume_keywords": resume_keywords
-        }
-        ref.push(log_data)
-        print("✅ Model log uploaded to Firebase.")
-    except Exception as e:
-        print(f"⚠️ Error uploading model log to Firebase: {e}")
-
-# ✅ Upload user feedback to Firebase
+    log_data = {
+        "timestamp": datetime.now().isoformat(),
+        "resume_text": resume_text,
+        "predicted_roles": predicted_roles,
+        "confidence_scores": confidence_scores,
+        "resume_keywords": resume_keywords
+    }
+    return get_uploader().submit("model_logs", log_data)
+
+# ✅ Queue user feedback for Firebase
 def upload_user_feedback(resume_text, predicted_role, true_role):
-    try:
-        ref = db.reference("user_feedback")
-        feedback_data = {
-            "timestamp": datetime.now().isoformat(),
-            "resume_text": resume_text,
-            "predicted_role": predicted_role,
-            "true_role": true_role
-        }
-        ref.push(feedback_data)
-        print("✅ User feedback uploaded to Firebase.")
-    except Exception as e:
-        print(f"⚠️ Error uploading user feedback to Firebase: {e}")
+    feedback_data = {
+        "timestamp": datetime.now().isoformat(),
+        "resume_text": resume_text,
+        "predicted_role": predicted_role,
+        "true_role": true_role
+    }
+    return get_uploader().submit("user_feedback", feedback_data)
 
 # ✅ Optional: Example testing if running this file standalone
 if __name__ == "__main__":
@@ -72,5 +367,7 @@ if __name__ == "__main__":
             "Machine Learning Engineer",
             "AI Researcher"
         )
+        get_uploader().close()
+        print(f"✅ Sent {get_uploader().sent} records, spooled {get_uploader().spooled}.")
     else:
         print("⚠️ Firebase app not initialized. Cannot run example uploads.")
@@ -0,0 +1,469 @@
+import os
+import gc
+import json
+import time
+import signal
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import tornado.web
+import tornado.netutil
+import tornado.httpserver
+from config.load_config import load_config
+import instrumentation
+from instrumentation import inc, observe
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(RuntimeError):
+    pass
+
+
+class ServiceError(RuntimeError):
+    pass
+
+
+def service_settings():
+    config = load_config()
+    settings = config.get("service", {})
+    return {
+        "host": settings.get("host", "0.0.0.0"),
+        "port": settings.get("port", 8600),
+        "url": settings.get("url", ""),
+        "max_batch": settings.get("max_batch", 32),
+        "max_wait_ms": settings.get("max_wait_ms", 10),
+        "max_queue": settings.get("max_queue", 256),
+        "max_chars": settings.get("max_chars", config.get("extraction", {}).get("max_chars", 30000)),
+        "top_n": config["model"].get("top_n", 3),
+        "timeout_seconds": settings.get("timeout_seconds", 10),
+        "workers": settings.get("workers", 1),
+        "threads_per_worker": settings.get("threads_per_worker", 0),
+        "memory_report_seconds": settings.get("memory_report_seconds", 60)
+    }
+
+
+def process_memory(pid="self"):
+    """RSS, PSS and private (unshared) bytes of a process, from /proc/<pid>/smaps_rollup.
+
+    PSS splits each shared page between the processes mapping it, so the PSS of all
+    workers adds up to what they really use together; RSS counts shared pages in full.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Private_Clean": "private", "Private_Dirty": "private"}
+    memory = {"rss": 0, "pss": 0, "private": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    memory[fields[name]] += int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+class MicroBatcher:
+    """Collects concurrent requests for up to ``max_wait_ms`` (or ``max_batch`` items) into one scoring call.
+
+    ``score_batch(texts, top_n)`` returns one result per text, scored for the largest
+    top_n in the batch (callers trim their own). It runs on a single worker thread so the event loop
+    keeps accepting requests; whatever queues up while a batch is being scored
+    forms the next batch. The queue is bounded and ``enqueue`` raises Overloaded
+    instead of letting latency grow without limit. Cancelling a queued future
+    (its client went away) drops the request before it is scored.
+    """
+
+    def __init__(self, score_batch, max_batch=32, max_wait_ms=10, max_queue=256):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._task = None
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def enqueue(self, text, top_n=3):
+        """Queue one text; returns the future its result is set on."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((text, top_n, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            inc("service_rejected_total")
+            raise Overloaded(f"Inference queue is full ({self._queue.maxsize} requests waiting), retry later")
+        return future
+
+    async def submit(self, text, top_n=3):
+        return await self.enqueue(text, top_n)
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return [item for item in batch if not item[2].done()]  # drop requests cancelled by a closed connection
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            started = time.perf_counter()
+            for _, _, _, queued in batch:
+                observe("queue_wait_ms", (started - queued) * 1000)
+            texts = [text for text, _, _, _ in batch]
+            top_n = max(n for _, n, _, _ in batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self.score_batch, texts, top_n)
+            except Exception as e:
+                logger.exception("❌ Inference batch failed")
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            inc("service_batches_total")
+            inc("service_requests_total", len(batch))
+            for (_, _, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+def _score_batch(texts, top_n):
+    from model_utils import recommend_top_roles_batch, get_role_data
+    data = get_role_data()
+    results, skills = recommend_top_roles_batch(texts, top_n=top_n, role_index=data.index, batch_size=len(texts),
+                                                return_skills=True)
+    return list(zip(results, skills))
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    def write_json(self, status, payload):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload))
+
+
+def _cached_recommendation(resume_text, top_n):
+    from model_utils import get_role_data, recommendation_key
+    from result_cache import get_cache
+    data = get_role_data()
+    key = recommendation_key(resume_text, top_n, data)
+    return data, key, get_cache("recommendation").get(key)
+
+
+def _cache_recommendation(key, value):
+    from result_cache import get_cache
+    get_cache("recommendation").put(key, value)
+
+
+_in_flight = 0
+
+
+class RecommendHandler(BaseHandler):
+    def initialize(self, batcher, settings):
+        self.batcher = batcher
+        self.service_settings = settings
+        self.pending = None
+        self.client_gone = False
+
+    def on_connection_close(self):
+        # The client went away: a request not yet scored is dropped instead of queued or scored
+        self.client_gone = True
+        if self.pending is not None and self.pending.cancel():
+            inc("service_cancelled_total")
+
+    async def post(self):
+        global _in_flight
+        _in_flight += 1
+        try:
+            await self._recommend()
+        finally:
+            _in_flight -= 1
+
+    async def _recommend(self):
+        try:
+            body = json.loads(self.request.body or b"{}")
+            resume_text = body["resume_text"]
+            top_n = int(body.get("top_n", self.service_settings["top_n"]))
+        except (ValueError, KeyError, TypeError):
+            return self.write_json(400, {"error": "Expected JSON body {\"resume_text\": str, \"top_n\": int}"})
+        if not isinstance(resume_text, str) or not resume_text.strip():
+            return self.write_json(400, {"error": "resume_text must be a non-empty string"})
+        if not 1 <= top_n <= 50:
+            return self.write_json(400, {"error": "top_n must be between 1 and 50"})
+        resume_text = resume_text[:self.service_settings["max_chars"]]
+
+        # Repeat submissions are answered from the shared recommendation cache without queueing;
+        # key hashing and cache disk I/O run off the event loop
+        loop = asyncio.get_running_loop()
+        data, key, cached = await loop.run_in_executor(None, _cached_recommendation, resume_text, top_n)
+        if cached is not None:
+            return self.write_json(200, {"results": cached["results"], "skills": cached["skills"],
+                                         "embeddings_version": data.version, "cached": True})
+        if self.client_gone:
+            inc("service_cancelled_total")
+            return
+        try:
+            with instrumentation.span("service_request"):
+                self.pending = self.batcher.enqueue(resume_text, top_n)
+                results, skills = await self.pending
+        except Overloaded as e:
+            self.set_header("Retry-After", "1")
+            return self.write_json(503, {"error": str(e)})
+        except asyncio.CancelledError:
+            if self.pending is not None and self.pending.cancelled():
+                return
+            raise
+        results = results[:top_n]
+        self.write_json(200, {"results": results, "skills": skills, "embeddings_version": data.version,
+                              "cached": False})
+        await loop.run_in_executor(None, _cache_recommendation, key, {"results": results, "skills": skills})
+
+
+class HealthHandler(BaseHandler):
+    def initialize(self, batcher, settings):
+        self.batcher = batcher
+
+    def get(self):
+        import model_registry
+        from model_utils import get_role_data
+        data = get_role_data()
+        self.write_json(200, {
+            "status": "ok",
+            "pid": os.getpid(),
+            "memory": process_memory(),
+            "embeddings_version": data.version,
+            "published": data.published,
+            "queue_depth": self.batcher.depth,
+            "batches": self.batcher.batches,
+            "requests": self.batcher.requests,
+            "loaded": model_registry.load_timings()
+        })
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def get(self):
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(instrumentation.render_prometheus())
+
+
+def make_app(batcher, settings):
+    args = {"batcher": batcher, "settings": settings}
+    return tornado.web.Application([
+        (r"/recommend", RecommendHandler, args),
+        (r"/health", HealthHandler, args),
+        (r"/metrics", MetricsHandler)
+    ])
+
+
+def recommend_remote(resume_text, top_n=3, url=None, timeout=None, with_skills=False):
+    """Client used by app.py (or any caller) to score one resume on a running service.
+
+    Returns the results list, or (results, skills) when ``with_skills`` is set.
+    """
+    import requests
+    if not url or not timeout:
+        settings = service_settings()
+        url, timeout = url or settings["url"], timeout or settings["timeout_seconds"]
+    url = url.rstrip("/")
+    try:
+        response = requests.post(f"{url}/recommend", json={"resume_text": resume_text, "top_n": top_n},
+                                 timeout=timeout)
+    except requests.RequestException as e:
+        raise ServiceError(f"Could not reach inference service at {url}: {e}") from e
+    if response.status_code != 200:
+        try:
+            message = response.json().get("error", response.text)
+        except ValueError:
+            message = response.text
+        raise ServiceError(f"Inference service returned {response.status_code}: {message}")
+    payload = response.json()
+    if with_skills:
+        return payload["results"], payload.get("skills", [])
+    return payload["results"]
+
+
+def load_shared_resources():
+    """Load everything requests need before accepting traffic (and before forking workers)."""
+    import model_registry
+    import model_utils  # registers the role_data resource
+    import skill_extractor  # registers the skills resource
+    instrumentation.setup_logging()
+    return model_registry.warm_up(["model", "role_data", "skills"])
+
+
+async def serve(settings, sockets=None):
+    if sockets is None:
+        load_shared_resources()
+    batcher = MicroBatcher(_score_batch, settings["max_batch"], settings["max_wait_ms"], settings["max_queue"]).start()
+    server = tornado.httpserver.HTTPServer(make_app(batcher, settings))
+    if sockets is None:
+        server.listen(settings["port"], address=settings["host"])
+    else:
+        server.add_sockets(sockets)
+    logger.info(f"✅ Inference service on {settings['host']}:{settings['port']} pid {os.getpid()} "
+                f"(max_batch={settings['max_batch']}, max_wait={settings['max_wait_ms']}ms, "
+                f"max_queue={settings['max_queue']})")
+    stop = asyncio.Event()
+    if sockets is not None:
+        # Pre-fork worker: SIGTERM (shutdown, or recycling after a reload) stops accepting
+        # new connections and lets the requests already in flight finish
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    await stop.wait()
+    server.stop()
+    deadline = time.monotonic() + settings["timeout_seconds"]
+    while _in_flight and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+
+# ---- pre-fork workers --------------------------------------------------------
+
+def _run_worker(sockets, settings, threads):
+    import torch
+    import model_utils
+    # The parent watches for new embedding versions and re-forks workers onto them
+    model_utils.set_reload_in_process(False)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    # Each worker gets its share of the cores instead of every worker starting one intra-op thread per core
+    torch.set_num_threads(threads)
+    try:
+        asyncio.run(serve(settings, sockets))
+    finally:
+        os._exit(0)
+
+
+def _fork_worker(sockets, settings, threads):
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(sockets, settings, threads)
+    return pid
+
+
+def _log_memory(workers):
+    parent = process_memory()
+    lines = [f"parent pid {os.getpid()}: rss {parent['rss'] / 1e6:.0f} MB, pss {parent['pss'] / 1e6:.0f} MB"]
+    total_pss = parent["pss"]
+    for slot, pid in sorted(workers.items()):
+        memory = process_memory(pid)
+        total_pss += memory["pss"]
+        lines.append(f"worker {slot} pid {pid}: rss {memory['rss'] / 1e6:.0f} MB, pss {memory['pss'] / 1e6:.0f} MB, "
+                     f"private {memory['private'] / 1e6:.0f} MB")
+    logger.info("📊 Memory: " + " | ".join(lines) + f" | total pss {total_pss / 1e6:.0f} MB")
+
+
+def serve_workers(settings):
+    """Load the model, role index and skill matcher once, then fork ``workers`` servers sharing them.
+
+    Children inherit the parent's pages copy-on-write: model weights are only read
+    and the role matrix is a memory-mapped file, so they stay shared. gc.freeze()
+    moves everything loaded so far out of the collector's reach, so collections in
+    the workers do not write to (and un-share) those objects. Dead workers are
+    re-forked from the loaded parent in milliseconds.
+
+    Workers do not hot-reload on their own (each would map and warm its own copy).
+    The parent watches CURRENT, loads a newly published store once, then forks a
+    fresh set of workers onto it and sends the old ones SIGTERM, which lets their
+    in-flight requests finish.
+    """
+    import model_registry
+    import model_utils
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")  # forked tokenizers must not inherit a thread pool
+    workers = max(1, int(settings["workers"]))
+    threads = int(settings["threads_per_worker"]) or max(1, (os.cpu_count() or 1) // workers)
+    load_shared_resources()
+    gc.collect()
+    gc.freeze()
+    sockets = tornado.netutil.bind_sockets(settings["port"], address=settings["host"])
+    logger.info(f"✅ Forking {workers} workers x {threads} threads on {settings['host']}:{settings['port']}")
+
+    children = {slot: _fork_worker(sockets, settings, threads) for slot in range(workers)}
+    stopping = False
+    reloader = model_utils.get_reloader()
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children.values():
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    interval = float(settings["memory_report_seconds"] or 0)
+    next_report = time.monotonic() + min(interval, 5) if interval else None
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid:
+            slot = next((s for s, p in children.items() if p == pid), None)
+            if slot is None:
+                continue
+            if stopping:
+                del children[slot]
+                continue
+            logger.warning(f"⚠️ Worker {slot} (pid {pid}) exited with status {status}, restarting")
+            children[slot] = _fork_worker(sockets, settings, threads)
+            continue
+        if next_report is not None and time.monotonic() >= next_report:
+            _log_memory(children)
+            next_report = time.monotonic() + interval
+        published = None if stopping else reloader.pending(model_registry.get("role_data"))
+        if published is not None and reloader.reload(published):
+            gc.collect()
+            gc.freeze()
+            retiring = list(children.values())
+            children = {slot: _fork_worker(sockets, settings, threads) for slot in children}
+            for pid in retiring:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            logger.info(f"✅ Workers re-forked onto role embeddings {published}")
+        time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    settings = service_settings()
+    parser = argparse.ArgumentParser(description="HTTP/JSON role recommendation service with micro-batching.")
+    parser.add_argument("--host", default=settings["host"])
+    parser.add_argument("--port", type=int, default=settings["port"])
+    parser.add_argument("--max-batch", type=int, default=settings["max_batch"])
+    parser.add_argument("--max-wait-ms", type=float, default=settings["max_wait_ms"])
+    parser.add_argument("--max-queue", type=int, default=settings["max_queue"])
+    parser.add_argument("--workers", type=int, default=settings["workers"],
+                        help="pre-forked worker processes sharing one loaded model (1 = single process)")
+    parser.add_argument("--threads-per-worker", type=int, default=settings["threads_per_worker"],
+                        help="torch intra-op threads per worker (0 = cores / workers)")
+    args = parser.parse_args()
+    settings.update(host=args.host, port=args.port, max_batch=args.max_batch,
+                    max_wait_ms=args.max_wait_ms, max_queue=args.max_queue,
+                    workers=args.workers, threads_per_worker=args.threads_per_worker)
+    if settings["workers"] > 1:
+        serve_workers(settings)
+    else:
+        asyncio.run(serve(settings))
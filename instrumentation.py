@@ -0,0 +1,283 @@
+import os
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config.load_config import load_config
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in milliseconds (upper bounds; +Inf is implicit)
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+_settings = load_config().get("metrics", {})
+_enabled = bool(_settings.get("enabled", False))
+_slow_ms = float(_settings.get("slow_span_ms", 0) or 0)
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(BUCKETS_MS) and value > BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        target, seen, lower = q * self.count, 0, 0.0
+        for i, n in enumerate(self.counts):
+            upper = BUCKETS_MS[i] if i < len(BUCKETS_MS) else BUCKETS_MS[-1]
+            if n and seen + n >= target:
+                return lower + (upper - lower) * (target - seen) / n
+            seen += n
+            lower = upper
+        return lower
+
+
+def observe(name, value_ms, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        hist = _histograms.get(_key(name, labels))
+        if hist is None:
+            hist = _histograms[_key(name, labels)] = _Histogram()
+        hist.observe(value_ms)
+
+
+def inc(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+class _Span:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = (time.perf_counter() - self.started) * 1000
+        observe("stage_latency_ms", elapsed, stage=self.stage)
+        if exc_type is not None:
+            inc("errors_total", stage=self.stage, error=exc_type.__name__)
+        elif _slow_ms and elapsed > _slow_ms:
+            logger.warning(f"⚠️ Slow {self.stage}: {elapsed:.0f} ms")
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(stage):
+    """Context manager timing one pipeline stage into the stage_latency_ms histogram."""
+    return _Span(stage) if _enabled else _NOOP
+
+
+# ---- process gauges --------------------------------------------------------
+
+def _update_process_gauges():
+    try:
+        with open("/proc/self/statm") as f:
+            resident = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        set_gauge("process_resident_memory_bytes", resident)
+    except (OSError, ValueError, AttributeError):
+        pass
+    import model_registry
+    for name, seconds in model_registry.load_timings().items():
+        set_gauge("resource_load_seconds", seconds, resource=name)
+
+
+# ---- export ----------------------------------------------------------------
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    """Everything collected so far in the Prometheus text exposition format."""
+    _update_process_gauges()
+    prefix = "resume_recommender_"
+    lines = []
+    with _lock:
+        histograms = {k: (list(h.counts), h.total, h.count) for k, h in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    for name in sorted({k[0] for k in histograms}):
+        lines.append(f"# TYPE {prefix}{name} histogram")
+        for (hist_name, labels), (counts, total, count) in sorted(histograms.items()):
+            if hist_name != name:
+                continue
+            cumulative = 0
+            for i, n in enumerate(counts):
+                cumulative += n
+                le = str(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else "+Inf"
+                lines.append(f"{prefix}{name}_bucket{_labels_text(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{prefix}{name}_sum{_labels_text(labels)} {round(total, 3)}")
+            lines.append(f"{prefix}{name}_count{_labels_text(labels)} {count}")
+    for kind, values in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({k[0] for k in values}):
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{prefix}{name}{_labels_text(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+def snapshot():
+    """Per-stage latency summary plus counters and gauges, for the dashboard panel."""
+    _update_process_gauges()
+    with _lock:
+        stages = [
+            {"stage": dict(labels).get("stage", name), "count": h.count,
+             "mean_ms": round(h.total / h.count, 2) if h.count else 0.0,
+             "p50_ms": round(h.quantile(0.5), 2), "p95_ms": round(h.quantile(0.95), 2),
+             "p99_ms": round(h.quantile(0.99), 2), "total_ms": round(h.total, 1)}
+            for (name, labels), h in sorted(_histograms.items())
+        ]
+        counters = {name + _labels_text(labels): value for (name, labels), value in sorted(_counters.items())}
+        gauges = {name + _labels_text(labels): value for (name, labels), value in sorted(_gauges.items())}
+    return {"stages": stages, "counters": counters, "gauges": gauges}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+def start_exporters():
+    """Start the configured /metrics endpoint and textfile writer once per process (no-op when disabled)."""
+    global _exporters_started
+    if not _enabled:
+        return
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+        port = int(_settings.get("port", 0) or 0)
+        if port:
+            try:
+                server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+                threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+                logger.info(f"✅ Metrics endpoint on :{port}/metrics")
+            except OSError as e:
+                # Another worker on this host already owns the port
+                logger.warning(f"⚠️ Metrics endpoint not started on :{port}: {e}")
+        textfile = _settings.get("textfile")
+        if textfile:
+            interval = float(_settings.get("textfile_interval_seconds", 15))
+
+            def _write_forever():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        write_textfile(textfile)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Could not write metrics file {textfile}: {e}")
+
+            threading.Thread(target=_write_forever, name="metrics-textfile", daemon=True).start()
+
+
+# ---- logging ---------------------------------------------------------------
+
+_logging_configured = False
+
+def setup_logging():
+    """Configure the root logger from the config 'logging' section (level, file) once per process."""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    settings = load_config().get("logging", {})
+    handlers = [logging.StreamHandler()]
+    if settings.get("file"):
+        os.makedirs(os.path.dirname(settings["file"]) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(settings["file"], encoding="utf-8"))
+    logging.basicConfig(
+        level=getattr(logging, str(settings.get("level", "INFO")).upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=handlers
+    )
@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import logging
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+from config.load_config import load_config
+
+MATRIX_FILE = "lexical.npz"
+META_FILE = "lexical.json"
+# Keeps tool names whole: c++, c#, node.js, ci/cd, objective-c
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+
+logger = logging.getLogger(__name__)
+
+
+def lexical_settings(config=None):
+    settings = (config or load_config()).get("lexical", {})
+    return {
+        "enabled": settings.get("enabled", True),
+        "weight": float(settings.get("weight", 0.0)),
+        "k1": settings.get("k1", 1.2),
+        "b": settings.get("b", 0.75),
+        "max_role_share": settings.get("max_role_share", 0.5),
+        "max_chars": settings.get("max_chars", 30000)
+    }
+
+
+def lexical_signature(weight):
+    """Short tag for cache keys: fused scores change with the weight."""
+    return f"lex{weight:g}"
+
+
+def tokenize(text, max_chars=30000):
+    return TOKEN.findall(str(text)[:max_chars].lower())
+
+
+class LexicalIndex:
+    """BM25 term-by-role matrix; a batch of resumes is scored with one sparse product.
+
+    Each role is one document: the concatenation of its postings (and labelled
+    feedback). Queries are binary term-presence rows, so a resume scores the sum of
+    the BM25 weights of the role terms it mentions.
+    """
+
+    def __init__(self, roles, terms, weights, params=None):
+        self.roles = list(roles)
+        self.terms = list(terms)
+        self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+        self.weights = sp.csr_matrix(weights, dtype=np.float32)
+        self.params = params or {}
+
+    @classmethod
+    def build(cls, roles, texts, k1=1.2, b=0.75, max_role_share=0.5, max_chars=30000):
+        counts = {}
+        for role, text in zip(roles, texts):
+            counts.setdefault(str(role), Counter()).update(tokenize(text, max_chars))
+        role_names = list(counts)
+        n_roles = len(role_names)
+        document_frequency = Counter(term for role_counts in counts.values() for term in role_counts)
+        # Stop words, and terms most roles use ("experience", "team"), carry no role signal
+        terms = sorted(t for t, n in document_frequency.items()
+                       if t not in ENGLISH_STOP_WORDS and (n_roles < 2 or n / n_roles <= max_role_share))
+        vocabulary = {term: i for i, term in enumerate(terms)}
+
+        lengths = np.array([sum(c.values()) for c in counts.values()], dtype=np.float64)
+        average = max(lengths.mean(), 1.0) if n_roles else 1.0
+        rows, cols, values = [], [], []
+        for r, role in enumerate(role_names):
+            norm = k1 * (1 - b + b * lengths[r] / average)
+            for term, tf in counts[role].items():
+                col = vocabulary.get(term)
+                if col is None:
+                    continue
+                df = document_frequency[term]
+                idf = np.log(1 + (n_roles - df + 0.5) / (df + 0.5))
+                rows.append(r)
+                cols.append(col)
+                values.append(idf * tf * (k1 + 1) / (tf + norm))
+        weights = sp.csr_matrix((values, (rows, cols)), shape=(n_roles, len(terms)), dtype=np.float32)
+        params = {"k1": k1, "b": b, "max_role_share": max_role_share}
+        return cls(role_names, terms, weights, params)
+
+    def save(self, store_path):
+        tmp = os.path.join(store_path, MATRIX_FILE + ".tmp.npz")
+        sp.save_npz(tmp, self.weights, compressed=True)
+        os.replace(tmp, os.path.join(store_path, MATRIX_FILE))
+        meta_tmp = os.path.join(store_path, META_FILE + ".tmp")
+        with open(meta_tmp, "w") as f:
+            json.dump({"roles": self.roles, "terms": self.terms, "params": self.params}, f)
+        os.replace(meta_tmp, os.path.join(store_path, META_FILE))
+
+    @classmethod
+    def load(cls, store_path):
+        with open(os.path.join(store_path, META_FILE), "r") as f:
+            meta = json.load(f)
+        return cls(meta["roles"], meta["terms"], sp.load_npz(os.path.join(store_path, MATRIX_FILE)), meta["params"])
+
+    def aligned(self, labels):
+        """Same index with rows in ``labels`` order; labels it has no text for get an empty row."""
+        position = {role: i for i, role in enumerate(self.roles)}
+        rows = [position.get(label, -1) for label in labels]
+        select = sp.csr_matrix((np.ones(sum(r >= 0 for r in rows), dtype=np.float32),
+                                ([i for i, r in enumerate(rows) if r >= 0], [r for r in rows if r >= 0])),
+                               shape=(len(labels), len(self.roles)))
+        return LexicalIndex(labels, self.terms, select @ self.weights, self.params)
+
+    def query_matrix(self, texts, max_chars=30000):
+        indptr, indices = [0], []
+        for text in texts:
+            cols = {self.vocabulary[t] for t in tokenize(text, max_chars) if t in self.vocabulary}
+            indices.extend(sorted(cols))
+            indptr.append(len(indices))
+        return sp.csr_matrix((np.ones(len(indices), dtype=np.float32), indices, indptr),
+                             shape=(len(texts), len(self.terms)))
+
+    def scores(self, queries):
+        """(queries x roles) scores scaled to [0, 1] per query, so they fuse with cosine scores."""
+        scores = (queries @ self.weights.T).toarray()
+        peak = scores.max(axis=1, keepdims=True)
+        peak[peak == 0] = 1.0
+        return (scores / peak).astype(np.float32)
+
+    def top_terms(self, query_row, role, n=5):
+        """Terms of one query row with the most BM25 weight for ``role`` (a row id)."""
+        role_row = self.weights.getrow(role)
+        weight = dict(zip(role_row.indices.tolist(), role_row.data.tolist()))
+        shared = [(weight[col], col) for col in query_row.indices.tolist() if col in weight]
+        return [self.terms[col] for _, col in sorted(shared, reverse=True)[:n]]
+
+
+def build_store_lexical(store_path, roles, texts, settings=None):
+    """Build and persist the lexical index inside an embedding store version."""
+    settings = settings or lexical_settings()
+    index = LexicalIndex.build(roles, texts, settings["k1"], settings["b"], settings["max_role_share"],
+                               settings["max_chars"])
+    index.save(store_path)
+    logger.info(f"✅ Built lexical index ({len(index.roles)} roles x {len(index.terms)} terms, "
+                f"{index.weights.nnz} weights)")
+    return index
+
+
+def load_store_lexical(store_path, labels, settings=None):
+    """The store's lexical index aligned to ``labels``, or None when disabled or not built.
+
+    Loaded even at weight 0: the weight only decides whether scores are fused,
+    and the index still supplies matched keywords.
+    """
+    settings = settings or lexical_settings()
+    if not settings["enabled"] or not os.path.exists(os.path.join(store_path, META_FILE)):
+        return None
+    return LexicalIndex.load(store_path).aligned(labels)
@@ -0,0 +1,323 @@
+import os
+import ast
+import json
+import time
+import glob
+import atexit
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config.load_config import load_config
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single-process use only
+    fcntl = None
+
+ACTIVE_FILE = "active.jsonl"
+ROTATING_FILE = "rotating.jsonl"
+LOCK_FILE = ".lock"
+
+# ✅ Fixed column types so every parquet segment of a log has the same layout
+SCHEMAS = {
+    "model_logs": pa.schema([
+        ("timestamp", pa.string()),
+        ("key", pa.string()),
+        ("resume_text", pa.string()),
+        ("predicted_roles", pa.list_(pa.string())),
+        ("confidence_scores", pa.list_(pa.float64())),
+        ("resume_keywords", pa.list_(pa.string())),
+        ("top_3_accuracy", pa.float64()),
+        ("average_max_similarity_score", pa.float64())
+    ]),
+    "user_feedback": pa.schema([
+        ("timestamp", pa.string()),
+        ("key", pa.string()),
+        ("resume_text", pa.string()),
+        ("predicted_role", pa.string()),
+        ("true_role", pa.string())
+    ])
+}
+
+# Row-oriented CSV logs this store replaces; imported once when a log is first opened
+LEGACY_CSV = {
+    "model_logs": "logs/model_logs.csv",
+    "user_feedback": "logs/user_feedback.csv"
+}
+
+
+def _compact_ts(timestamp):
+    return "".join(c for c in str(timestamp) if c.isdigit())[:20]
+
+
+class LogStore:
+    """Append-only log of one record type: a JSONL head segment rotated into parquet segments.
+
+    Appends are buffered in memory and written in batches under an exclusive
+    file lock, so several Streamlit processes can share one store. Once the
+    head segment passes ``rotate_bytes`` or ``rotate_seconds`` it is converted
+    to an immutable parquet file named by its timestamp range, which lets
+    ``read`` skip whole segments outside the requested window and load only
+    the requested columns.
+    """
+
+    def __init__(self, name, root="logs/store", flush_rows=50, flush_seconds=5.0,
+                 rotate_bytes=16 * 1024 * 1024, rotate_seconds=3600.0, import_legacy=True):
+        if name not in SCHEMAS:
+            raise KeyError(f"No log schema named '{name}', expected one of {sorted(SCHEMAS)}")
+        self.name = name
+        self.schema = SCHEMAS[name]
+        self.path = os.path.join(root, name)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._timer = None
+        self._last_flush = time.monotonic()
+        self.written = 0
+
+        os.makedirs(root, exist_ok=True)
+        try:
+            os.mkdir(self.path)  # atomic: only the process that creates the store imports legacy rows
+            new_store = True
+        except FileExistsError:
+            new_store = False
+        legacy = LEGACY_CSV.get(name)
+        if import_legacy and new_store and legacy and os.path.exists(legacy):
+            self.import_csv(legacy)
+
+    # ---- writing -------------------------------------------------------
+
+    def _normalize(self, record):
+        row = {field: record.get(field) for field in self.schema.names}
+        row["timestamp"] = row["timestamp"] or datetime.now().isoformat()
+        return row
+
+    def append(self, record):
+        """Buffer one record; written when the batch fills, the interval passes, or at exit."""
+        with self._buffer_lock:
+            self._buffer.append(self._normalize(record))
+            due = (len(self._buffer) >= self.flush_rows
+                   or time.monotonic() - self._last_flush >= self.flush_seconds)
+            if not due and self._timer is None:
+                # Bound how long a lone record can sit in memory on a quiet server
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def extend(self, records, rotate_by_age=True):
+        """Write ``records`` now. Bulk loaders of old rows pass ``rotate_by_age=False`` (every
+        batch would otherwise be "old" and become its own segment) and call ``check_rotation`` at the end."""
+        with self._buffer_lock:
+            self._buffer.extend(self._normalize(r) for r in records)
+        self.flush(rotate_by_age)
+
+    def _locked(self, exclusive=True):
+        f = open(os.path.join(self.path, LOCK_FILE), "a")
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return f
+
+    def flush(self, rotate_by_age=True):
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not batch:
+            return 0
+        payload = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in batch)
+        active = os.path.join(self.path, ACTIVE_FILE)
+        with self._locked():
+            with open(active, "a", encoding="utf-8") as f:
+                f.write(payload)
+            self._maybe_rotate(active, rotate_by_age)
+        self.written += len(batch)
+        return len(batch)
+
+    def check_rotation(self):
+        """Apply the size/age rotation rules to the head segment now."""
+        with self._locked():
+            self._maybe_rotate(os.path.join(self.path, ACTIVE_FILE))
+
+    def _maybe_rotate(self, active, by_age=True):
+        # Caller holds the exclusive lock; cost depends on the head segment only, not the log size
+        rotating = os.path.join(self.path, ROTATING_FILE)
+        if os.path.exists(rotating):
+            self._convert(rotating)  # finish a rotation interrupted by a crash
+        if not os.path.exists(active):
+            return
+        size = os.path.getsize(active)
+        if size == 0:
+            return
+        if size < self.rotate_bytes:
+            if not by_age:
+                return
+            with open(active, "r", encoding="utf-8") as f:
+                first = f.readline()
+            try:
+                age = (datetime.now() - datetime.fromisoformat(json.loads(first)["timestamp"])).total_seconds()
+            except (TypeError, ValueError, KeyError):
+                age = 0
+            if age < self.rotate_seconds:
+                return
+        os.replace(active, rotating)
+        self._convert(rotating)
+
+    def _convert(self, rotating):
+        rows = []
+        with open(rotating, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue  # torn line from a crash mid-write
+        if rows:
+            timestamps = [str(r["timestamp"]) for r in rows]
+            digest = hashlib.sha1("".join(r.get("key") or "" for r in rows).encode()
+                                  + str(len(rows)).encode() + timestamps[0].encode()).hexdigest()[:8]
+            # Deterministic name: re-running an interrupted conversion overwrites instead of duplicating
+            name = f"part-{_compact_ts(min(timestamps))}_{_compact_ts(max(timestamps))}_{digest}.parquet"
+            table = pa.Table.from_pylist(rows, schema=self.schema)
+            tmp = os.path.join(self.path, name + ".tmp")
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, os.path.join(self.path, name))
+        os.remove(rotating)
+
+    def rotate(self):
+        """Force the head segment into parquet (e.g. before archiving the log directory)."""
+        self.flush()
+        active = os.path.join(self.path, ACTIVE_FILE)
+        with self._locked():
+            if os.path.exists(active) and os.path.getsize(active):
+                os.replace(active, os.path.join(self.path, ROTATING_FILE))
+                self._convert(os.path.join(self.path, ROTATING_FILE))
+
+    # ---- reading -------------------------------------------------------
+
+    def segments(self, since=None, until=None):
+        """Parquet segments whose timestamp range overlaps [since, until]."""
+        lo = _compact_ts(since) if since else None
+        hi = _compact_ts(until) if until else None
+        selected = []
+        for path in sorted(glob.glob(os.path.join(self.path, "part-*.parquet"))):
+            first, last = os.path.basename(path)[5:-8].split("_")[:2]
+            if lo and last[:len(lo)] < lo:
+                continue
+            if hi and first[:len(hi)] > hi:
+                continue
+            selected.append(path)
+        return selected
+
+    def read(self, columns=None, since=None, until=None):
+        """DataFrame of the requested columns for records with since <= timestamp <= until (ISO strings)."""
+        self.flush()
+        columns = list(columns or self.schema.names)
+        read_columns = columns if "timestamp" in columns else columns + ["timestamp"]
+        filters = []
+        if since:
+            filters.append(("timestamp", ">=", str(since)))
+        if until:
+            filters.append(("timestamp", "<=", str(until)))
+
+        # Segment list and head rows are taken under the lock; parquet segments are immutable afterwards
+        with self._locked(exclusive=False):
+            paths = self.segments(since, until)
+            head = []
+            active = os.path.join(self.path, ACTIVE_FILE)
+            if os.path.exists(active):
+                with open(active, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            head.append(json.loads(line))
+                        except ValueError:
+                            continue
+
+        tables = [pq.read_table(p, columns=read_columns, filters=filters or None) for p in paths]
+        if head:
+            head = [r for r in head
+                    if (not since or str(r["timestamp"]) >= str(since))
+                    and (not until or str(r["timestamp"]) <= str(until))]
+            schema = pa.schema([self.schema.field(c) for c in read_columns])
+            tables.append(pa.Table.from_pylist([{c: r.get(c) for c in read_columns} for r in head], schema=schema))
+        if not tables:
+            return pd.DataFrame(columns=columns)
+        return pa.concat_tables(tables).select(columns).to_pandas()
+
+    def import_csv(self, csv_path):
+        """One-off import of a legacy CSV log (list columns were written as Python reprs)."""
+        df = pd.read_csv(csv_path, on_bad_lines='skip')
+        df = df.loc[:, ~df.columns.str.contains('^Unnamed')]
+        records = []
+        for row in df.to_dict("records"):
+            record = {}
+            for field in self.schema:
+                value = row.get(field.name)
+                if isinstance(value, float) and pd.isna(value):
+                    value = None
+                if value is not None and pa.types.is_list(field.type) and isinstance(value, str):
+                    try:
+                        value = ast.literal_eval(value)
+                    except (ValueError, SyntaxError):
+                        value = [value]
+                if value is not None and field.name == "resume_text":
+                    value = str(value).replace("\\n", "\n")
+                record[field.name] = value
+            records.append(record)
+        self.extend(records)
+        print(f"✅ Imported {len(records)} rows from {csv_path} into {self.path}")
+        return len(records)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_log_store(name):
+    """Process-wide LogStore for a log, configured from the config 'log_store' section."""
+    with _stores_lock:
+        if name not in _stores:
+            settings = load_config().get("log_store", {})
+            store = LogStore(
+                name,
+                root=settings.get("path", "logs/store"),
+                flush_rows=settings.get("flush_rows", 50),
+                flush_seconds=settings.get("flush_seconds", 5),
+                rotate_bytes=int(settings.get("rotate_mb", 16) * 1024 * 1024),
+                rotate_seconds=settings.get("rotate_minutes", 60) * 60
+            )
+            atexit.register(store.flush)
+            _stores[name] = store
+        return _stores[name]
+
+
+def append_log(name, record):
+    get_log_store(name).append(record)
+
+
+def read_logs(name, columns=None, since=None, until=None):
+    return get_log_store(name).read(columns=columns, since=since, until=until)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or maintain the local prediction/feedback log store.")
+    parser.add_argument("command", choices=["stats", "rotate", "import-csv"])
+    parser.add_argument("--log", choices=sorted(SCHEMAS), default=None)
+    parser.add_argument("--csv", default=None, help="CSV to import (defaults to the legacy path for the log)")
+    args = parser.parse_args()
+
+    for name in [args.log] if args.log else sorted(SCHEMAS):
+        store = get_log_store(name)
+        if args.command == "import-csv":
+            store.import_csv(args.csv or LEGACY_CSV[name])
+        elif args.command == "rotate":
+            store.rotate()
+        rows = len(store.read(columns=["timestamp"]))
+        print(f"📦 {name}: {rows} rows in {len(store.segments())} parquet segments")
@@ -0,0 +1,130 @@
+import time
+import logging
+import threading
+from config.load_config import load_config
+
+logger = logging.getLogger(__name__)
+
+# ✅ One instance of each heavy resource per process, created on first use
+_loaders = {}
+_resources = {}
+_timings = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, loader):
+    with _registry_lock:
+        _loaders[name] = loader
+        _locks.setdefault(name, threading.Lock())
+
+
+def get(name):
+    if name in _resources:
+        return _resources[name]
+    if name not in _loaders:
+        raise KeyError(f"No resource registered under '{name}'")
+    with _locks[name]:
+        if name not in _resources:
+            start = time.perf_counter()
+            _resources[name] = _loaders[name]()
+            _timings[name] = round(time.perf_counter() - start, 3)
+            logger.info(f"✅ Loaded {name} in {_timings[name]}s")
+    return _resources[name]
+
+
+def is_loaded(name):
+    return name in _resources
+
+
+def reset(name):
+    with _locks.get(name, _registry_lock):
+        _resources.pop(name, None)
+        _timings.pop(name, None)
+
+
+def swap(name, resource, seconds=None):
+    """Replace a loaded resource in one step (double buffering).
+
+    Callers that already hold the old object finish with it; every later get()
+    returns the new one. The old object is freed once nothing references it.
+    """
+    with _locks.get(name, _registry_lock):
+        _resources[name] = resource
+        if seconds is not None:
+            _timings[name] = round(seconds, 3)
+
+
+def warm_up(names=None):
+    """Load the given (default: all registered) resources now instead of on first request."""
+    for name in names or list(_loaders):
+        get(name)
+    return load_timings()
+
+
+def load_timings():
+    return dict(_timings)
+
+
+def _load_base_model():
+    from sentence_transformers import SentenceTransformer
+    model_config = load_config()["model"]
+    device = "cuda" if model_config.get("use_gpu") else "cpu"
+    model = SentenceTransformer(model_config["embedding_model_name"], device=device)
+    model.precision = "fp32"
+    return model
+
+
+def _load_sentence_model():
+    """The query encoder at the configured precision, activated only if it passes the accuracy gate."""
+    from precision import apply_precision, check_precision, precision_settings
+    settings = precision_settings()
+    base = get("model_fp32")
+    if settings["precision"] == "fp32":
+        return base
+
+    from model_utils import get_role_data
+    encoder = apply_precision(base, settings["precision"])
+    verdict = check_precision(encoder, settings["precision"], settings["model_name"],
+                              get_role_data().version, settings["min_accuracy"], settings["eval_path"])
+    if not verdict["passed"]:
+        logger.warning(f"⚠️ Refusing {settings['precision']} inference: top-3 accuracy {verdict['accuracy']} "
+                       f"< {settings['min_accuracy']}. Using fp32.")
+        return base
+    logger.info(f"✅ {settings['precision']} inference enabled (top-3 accuracy {verdict['accuracy']}).")
+    if settings["precision"] == "int8":
+        reset("model_fp32")  # quantize_dynamic made a copy; role regeneration reloads fp32 on demand
+    return encoder
+
+
+register("model_fp32", _load_base_model)
+register("model", _load_sentence_model)
+
+
+def get_model():
+    """Encoder for resumes/queries (may be bf16 or int8 when the accuracy gate allows it)."""
+    return get("model")
+
+
+def get_base_model():
+    """Full-precision encoder used to build stored role embeddings."""
+    return get("model_fp32")
+
+
+def active_precision():
+    """Precision queries are encoded with, resolved without loading the model when possible.
+
+    None means the gate has not run yet for this configuration.
+    """
+    if is_loaded("model"):
+        return getattr(get("model"), "precision", "fp32")
+    from precision import cached_gate_result, precision_settings
+    settings = precision_settings()
+    if settings["precision"] == "fp32":
+        return "fp32"
+    from model_utils import get_role_data
+    verdict = cached_gate_result(settings["precision"], settings["model_name"],
+                                 get_role_data().version, settings["eval_path"])
+    if verdict is None or verdict["min_accuracy"] != settings["min_accuracy"]:
+        return None
+    return settings["precision"] if verdict["passed"] else "fp32"
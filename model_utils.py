@@ -1,59 +1,197 @@
 import os
-import io
 import re
 import json
-import pickle
-import csv
+import time
+import logging
+import threading
 from datetime import datetime
-import fitz
+from collections import namedtuple
 import numpy as np
 import pandas as pd
-import spacy
-import docx2txt
-from sentence_transformers import SentenceTransformer, util
+import model_registry
+from model_registry import get_model, get_base_model
+from config.load_config import load_config
+from role_index import RoleIndex
+from embedding_store import (load_embeddings, publish_embeddings, current_version, role_prototypes,
+                             prototype_settings, EmbeddingStoreError)
+from result_cache import get_cache, hash_key
+from extraction import extract_resume, ExtractionError
+from ann_index import load_store_index
+from precision import embedding_dtype
+from log_store import append_log, read_logs
+from instrumentation import span, inc
+from chunking import chunk_settings, chunking_signature, chunk_text, pool_chunks
+from skill_extractor import get_skill_extractor
+from lexical_index import lexical_settings, lexical_signature, load_store_lexical, tokenize
 try:
     from firebase_utils import upload_model_log
 except ImportError:
     upload_model_log = None
 
-print("Loading model...")
-model = SentenceTransformer('all-mpnet-base-v2', device='cpu')
-nlp = spacy.load("en_core_web_sm")
-
-# ✅ Load Roles
-roles_df = pd.read_csv("job_title_des_cleaned.csv")
-roles = roles_df['Job Title'].tolist()
-descriptions = roles_df['Cleaned_Description'].tolist()
-
-# ✅ Load User Feedback if available
-feedback_path = "logs/user_feedback.csv"
-if os.path.exists(feedback_path):
-    feedback_df = pd.read_csv(feedback_path)
-    combined = pd.concat([
-        roles_df[['Cleaned_Description', 'Job Title']].rename(columns={'Cleaned_Description':'resume_text', 'Job Title':'true_role'}),
-        feedback_df[['resume_text', 'true_role']]
-    ])
-    grouped = combined.groupby("true_role")['resume_text'].apply(lambda x: " ".join(x)).reset_index()
-    roles = grouped['true_role'].tolist()
-    descriptions = grouped['resume_text'].tolist()
-
-# ✅ Load or Generate Role Embeddings
-if os.path.exists("role_embeddings.pkl"):
-    with open("role_embeddings.pkl", "rb") as f:
-        role_embeddings = pickle.load(f)
-else:
-    role_embeddings = model.encode(descriptions, convert_to_tensor=True)
-    with open("role_embeddings.pkl", "wb") as f:
-        pickle.dump(role_embeddings, f)
+logger = logging.getLogger(__name__)
+
+# ✅ Request-path settings are read once per process; config.yaml is not re-parsed per request
+_config = load_config()
+CHUNKING = chunk_settings(_config)
+_chunking_signature = chunking_signature(CHUNKING)
+_service = _config.get("service", {})
+_metrics_interval = _config.get("log_store", {}).get("metrics_interval_seconds", 60)
+
+RoleData = namedtuple("RoleData", ["roles", "embeddings", "index", "version", "published"])
+
+
+def load_role_training_texts(config):
+    # One row per posting, plus one per labelled feedback resume
+    roles_df = pd.read_csv(config["paths"]["role_data_path"]).dropna(subset=['Job Title', 'Cleaned_Description'])
+    roles = roles_df['Job Title'].tolist()
+    descriptions = roles_df['Cleaned_Description'].tolist()
+
+    feedback_df = read_logs("user_feedback", columns=["resume_text", "true_role"])
+    feedback_df = feedback_df.dropna(subset=['resume_text', 'true_role'])
+    roles += feedback_df['true_role'].tolist()
+    descriptions += feedback_df['resume_text'].tolist()
+    return roles, descriptions
+
+
+def _load_role_data(regenerate=True):
+    config = load_config()
+    model_name = config["model"]["embedding_model_name"]
+    store_path = config["paths"]["role_embeddings_path"]
+    index_config = config.get("index", {})
+
+    # ✅ Labels come from the store manifest, never from row order guesses
+    try:
+        store = load_embeddings(store_path, expected_model=model_name)
+    except EmbeddingStoreError as e:
+        if not regenerate:
+            raise
+        logger.warning(f"⚠️ {e}, regenerating role embeddings...")
+        texts = load_role_training_texts(config)
+        prototypes = prototype_settings(config)
+        roles, embeddings = role_prototypes(texts[0], encode_texts(texts[1], get_base_model()),
+                                            prototypes["per_role"], prototypes["method"])
+        publish_embeddings(store_path, embeddings, roles, model_name,
+                           dtype=embedding_dtype(config), index_config=index_config, lexical_texts=texts)
+        store = load_embeddings(store_path, expected_model=model_name)
+
+    # ✅ Optional approximate index persisted next to the store (exact brute force otherwise)
+    reduction = config["model"].get("role_reduction", "max")
+    ann = load_store_index(store.path, store, index_config)
+    if ann is not None and reduction != "max":
+        logger.warning(f"⚠️ ANN index ignored: role_reduction '{reduction}' needs exact search.")
+        ann = None
+
+    # ✅ Precompute role -> rows index (row/label mismatch raises here instead of being skipped)
+    index = RoleIndex(
+        store.roles,
+        store.embeddings,
+        reduction=reduction,
+        top_m=config["model"].get("role_top_m", 3),
+        normalized=True,
+        ann=ann,
+        candidates=index_config.get("candidates", 200)
+    )
+    # ✅ BM25 term-by-role matrix published with the same store version, fused into top_k
+    lexical = lexical_settings(config)
+    index.attach_lexical(load_store_lexical(store.path, index.labels, lexical), lexical["weight"])
+    published = os.path.basename(store.path) if store.path != store_path else None
+    return RoleData(store.roles, store.embeddings, index, store.version, published)
+
+
+model_registry.register("role_data", _load_role_data)
+
+
+class RoleDataReloader:
+    """Picks up a newly published embedding store without a restart.
+
+    ``poll`` costs one small file read at most every ``interval`` seconds. When
+    CURRENT names a different version, the new RoleData is loaded (and its
+    pages touched) on a background thread while requests keep using the old one,
+    then swapped into the registry; in-flight requests finish on the version they
+    started with. A pre-fork parent calls ``pending``/``reload`` itself instead, so
+    the new version is loaded once and shared by the workers it re-forks.
+    """
+
+    def __init__(self, store_path, interval):
+        self.store_path = store_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._loading = None
+        self._failed = None
+
+    def pending(self, data):
+        """Newly published version to load (and mark as loading), or None."""
+        now = time.monotonic()
+        if not self.interval or now - self._checked < self.interval:
+            return None
+        with self._lock:
+            if now - self._checked < self.interval or self._loading:
+                return None
+            self._checked = now
+            published = current_version(self.store_path)
+            if published is None or published in (data.published, self._failed):
+                return None
+            self._loading = published
+        return published
+
+    def poll(self, data):
+        published = self.pending(data)
+        if published is None:
+            return False
+        threading.Thread(target=self.reload, args=(published,), name="role-data-reload", daemon=True).start()
+        return True
+
+    def reload(self, published):
+        """Load ``published`` and swap it in; True on success."""
+        started = time.perf_counter()
+        try:
+            data = _load_role_data(regenerate=False)
+            data.index.top_k(np.zeros((1, data.embeddings.shape[1]), dtype=np.float32), 1)  # fault pages in
+            model_registry.swap("role_data", data, time.perf_counter() - started)
+            inc("role_data_reloads_total", result="ok")
+            logger.info(f"✅ Role embeddings reloaded: {data.published} ({len(data.roles)} rows, "
+                        f"{time.perf_counter() - started:.2f}s)")
+            return True
+        except Exception as e:
+            self._failed = published
+            inc("role_data_reloads_total", result="error")
+            logger.warning(f"⚠️ Could not load published role embeddings {published}, keeping the current ones: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._loading = None
+
+
+_reloader = None
+_reload_in_process = True
+
+
+def get_reloader():
+    global _reloader
+    if _reloader is None:
+        paths = load_config()["paths"]
+        _reloader = RoleDataReloader(paths["role_embeddings_path"], float(paths.get("reload_check_seconds", 5) or 0))
+    return _reloader
+
+
+def set_reload_in_process(enabled):
+    """Turn off this process's own store watcher (pre-fork workers: the parent reloads and re-forks them)."""
+    global _reload_in_process
+    _reload_in_process = bool(enabled)
+
+
+def get_role_data():
+    """Live role data; also checks (cheaply, off the request path) for a newer published store."""
+    data = model_registry.get("role_data")
+    if _reload_in_process:
+        get_reloader().poll(data)
+    return data
 
 # ✅ Utilities
 def extract_text_from_resume(file):
-    if file.name.endswith(".pdf"):
-        doc = fitz.open(stream=file.read(), filetype="pdf")
-        return "".join(page.get_text() for page in doc)
-    elif file.name.endswith(".docx"):
-        return docx2txt.process(io.BytesIO(file.read()))
-    return "Unsupported file type."
+    # Bounded extraction; raises ExtractionError instead of returning placeholder text
+    return extract_resume(file).text
 
 def clean_text(text):
     text = text.lower()
@@ -61,49 +199,209 @@ def clean_text(text):
     text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
     return text
 
-def recommend_top_roles_from_resume(resume_text, roles, descriptions, role_embeddings, model, top_n=3):
-    cleaned = clean_text(resume_text)
-    embedding = model.encode(cleaned, convert_to_tensor=True)
-    scores = util.cos_sim(embedding, role_embeddings)[0].cpu().numpy()
-    top_idx = np.argsort(scores)[::-1]
-
-    seen = set()
-    results = []
-    for idx in top_idx:
-        if idx >= len(roles): continue
-        role = roles[idx]
-        if role not in seen:
-            results.append({"role": role, "confidence": round(scores[idx]*100,2), "keywords": []})
-            seen.add(role)
-        if len(results) == top_n:
-            break
-
-    return results, []
+def encode_texts(texts, model, batch_size=32):
+    # Batched, L2-normalised float32 embeddings so cosine similarity is a plain dot product
+    embeddings = model.encode(
+        list(texts),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+def encode_documents(texts, model, batch_size=32, settings=None, role_index=None):
+    """encode_texts for resumes: long texts are split into token-bounded chunks and pooled.
+
+    All chunks of all texts go through one batched encode call; per-text cost is capped
+    by max_chunks whatever the document length. Pooling 'off' keeps the single-pass encoding.
+    Attention pooling weights each chunk by its best match against ``role_index`` rows.
+    """
+    settings = CHUNKING if settings is None else settings
+    if settings["pooling"] == "off":
+        return encode_texts(texts, model, batch_size=batch_size)
+    chunk_tokens = settings["chunk_tokens"] or model.max_seq_length - 2
+    chunks, chunks_per_doc, token_counts = [], [], []
+    for text in texts:
+        pieces, counts = chunk_text(text, model.tokenizer, chunk_tokens, settings["max_chunks"])
+        chunks += pieces
+        token_counts += counts
+        chunks_per_doc.append(len(pieces))
+    vectors = encode_texts(chunks, model, batch_size=batch_size)
+    relevance = None
+    if settings["pooling"] == "attention" and role_index is not None:
+        relevance = role_index.row_scores(vectors).max(axis=1)
+    return pool_chunks(vectors, chunks_per_doc, token_counts, settings["pooling"],
+                       settings["attention_temperature"], relevance)
+
+def _keywords(role_index, idx, skills, extractor, lexical_query):
+    # The resume's skills the role's postings ask for most, then its terms with the most BM25 weight for the role
+    keywords = extractor.keywords(role_index.labels[idx], skills) if extractor else []
+    limit = extractor.keywords_per_role if extractor else 5
+    if lexical_query is not None and len(keywords) < limit:
+        # Lexical terms are single lowercase tokens: skip any already part of a skill phrase ("REST APIs")
+        covered = {token for keyword in keywords for token in tokenize(keyword)}
+        keywords += [t for t in role_index.lexical.top_terms(lexical_query, idx, limit) if t not in covered]
+    return keywords[:limit]
+
+def _result_dicts(role_index, top_idx, top_scores, skills=(), extractor=None, lexical_query=None):
+    return [
+        {"role": role_index.labels[idx], "confidence": round(float(score) * 100, 2),
+         "keywords": _keywords(role_index, idx, skills, extractor, lexical_query)}
+        for idx, score in zip(top_idx, top_scores) if np.isfinite(score)
+    ]
+
+def _lexical_queries(role_index, texts):
+    if role_index.lexical is None:
+        return None
+    with span("lexical"):
+        return role_index.lexical.query_matrix(texts)
+
+def recommend_top_roles_from_resume(resume_text, roles=None, descriptions=None, role_embeddings=None,
+                                    model=None, top_n=3, role_index=None):
+    if role_index is None:
+        role_index = get_role_index(roles, role_embeddings)
+    model = get_model() if model is None else model
+    with span("clean"):
+        cleaned = clean_text(resume_text)
+    with span("encode"):
+        embedding = encode_documents([cleaned], model, role_index=role_index)
+    queries = _lexical_queries(role_index, [resume_text])
+    with span("scoring"):
+        top_idx, top_scores = role_index.top_k(embedding, top_n, lexical_queries=queries)
+    extractor = get_skill_extractor()
+    with span("skills"):
+        skills = extractor.extract(resume_text)
+    results = _result_dicts(role_index, top_idx[0], top_scores[0], skills, extractor,
+                            queries[0] if queries is not None else None)
+    return results, extractor.display(skills)
+
+def recommend_top_roles_batch(resume_texts, top_n=3, model=None, role_index=None, batch_size=32,
+                              return_skills=False):
+    """Batched recommend_top_roles_from_resume: one encode call and one matrix product per batch.
+
+    Skills for the whole batch come from one nlp.pipe pass; ``return_skills=True`` returns
+    (results, skills) lists instead of just the results.
+    """
+    if not resume_texts:
+        return ([], []) if return_skills else []
+    role_index = get_role_index() if role_index is None else role_index
+    model = get_model() if model is None else model
+    with span("clean"):
+        cleaned = [clean_text(text) for text in resume_texts]
+    with span("encode"):
+        embeddings = encode_documents(cleaned, model, batch_size=batch_size, role_index=role_index)
+    queries = _lexical_queries(role_index, resume_texts)
+    with span("scoring"):
+        top_idx, top_scores = role_index.top_k(embeddings, top_n, lexical_queries=queries)
+    extractor = get_skill_extractor()
+    with span("skills"):
+        skills = extractor.extract_batch(resume_texts)
+    results = [_result_dicts(role_index, idx, scores, found, extractor, queries[i] if queries is not None else None)
+               for i, (idx, scores, found) in enumerate(zip(top_idx, top_scores, skills))]
+    if return_skills:
+        return results, [extractor.display(found) for found in skills]
+    return results
+
+def get_role_index(roles=None, role_embeddings=None):
+    # Shared precomputed index unless the caller brings its own labels/embeddings
+    if (roles is None) != (role_embeddings is None):
+        raise ValueError("roles and role_embeddings must be given together (one label per row)")
+    data = get_role_data()
+    same_roles = roles is None or roles is data.roles
+    same_embeddings = role_embeddings is None or role_embeddings is data.embeddings
+    if same_roles and same_embeddings:
+        return data.index
+    return RoleIndex(roles, role_embeddings, reduction=data.index.reduction, top_m=data.index.top_m)
+
+def _upload_digest(file):
+    # Hash the upload buffer in place when possible instead of copying its bytes
+    if hasattr(file, "getbuffer"):
+        return hash_key(file.getbuffer())
+    data = file.read()
+    file.seek(0)
+    return hash_key(data)
+
+def extract_text_cached(file):
+    """extract_text_from_resume keyed by the uploaded bytes; returns (text, upload_key)."""
+    upload_key = hash_key(os.path.splitext(file.name)[1].lower(), _upload_digest(file))
+    cache = get_cache("extraction")
+    text = cache.get(upload_key)
+    if text is None:
+        file.seek(0)
+        with span("extraction"):
+            text = extract_text_from_resume(file)
+        cache.put(upload_key, text)
+    return text, upload_key
+
+def recommendation_key(resume_text, top_n, data=None):
+    data = get_role_data() if data is None else data
+    return hash_key(clean_text(resume_text), data.version, data.index.reduction, top_n,
+                    _chunking_signature, lexical_signature(data.index.lexical_weight))
+
+def recommend_top_roles_cached(resume_text, top_n=3):
+    """recommend_top_roles_from_resume keyed by cleaned text + embeddings version.
+
+    When service.url is configured the shared inference service scores cache misses,
+    falling back to the in-process model if it is unreachable or overloaded.
+    """
+    if _service.get("url"):
+        from inference_service import recommend_remote, ServiceError
+        try:
+            return recommend_remote(resume_text, top_n=top_n, url=_service["url"],
+                                    timeout=_service.get("timeout_seconds", 10), with_skills=True)
+        except ServiceError as e:
+            logger.warning(f"⚠️ Inference service unavailable, scoring locally: {e}")
+
+    data = get_role_data()
+    key = recommendation_key(resume_text, top_n, data)
+    cache = get_cache("recommendation")
+    cached = cache.get(key)
+    if cached is not None:
+        return cached["results"], cached["skills"]
+    results, skills = recommend_top_roles_from_resume(resume_text, top_n=top_n, role_index=data.index)
+    cache.put(key, {"results": results, "skills": skills})
+    return results, skills
+
+_metrics_lock = threading.Lock()
+_metrics_written = {}
 
 def compute_and_save_metrics(predictions, path="artifacts/evaluation_metrics.json"):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
     metrics = {
         "top_3_accuracy": 1.0,
         "average_max_similarity_score": round(predictions[0]['confidence']/100, 4)
     }
-    with open(path, "w") as f:
+    # ✅ Throttled: the file is rewritten at most once per interval, not on every request
+    with _metrics_lock:
+        if time.monotonic() - _metrics_written.get(path, -_metrics_interval) < _metrics_interval:
+            return metrics
+        _metrics_written[path] = time.monotonic()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
         json.dump(metrics, f, indent=2)
+    os.replace(tmp, path)
     return metrics
 
-def log_prediction(resume_text, predictions, resume_keywords, evaluation_metrics, path="logs/model_logs.csv"):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    row = {
+def log_prediction(resume_text, predictions, resume_keywords, evaluation_metrics, key=None):
+    # ✅ Buffered append to the local log store (batched, locked, rotated to parquet)
+    with span("log_prediction"):
+        append_log("model_logs", {
+            "timestamp": datetime.now().isoformat(),
+            "key": key,
+            "resume_text": resume_text,
+            "predicted_roles": [r['role'] for r in predictions],
+            "confidence_scores": [float(r['confidence']) for r in predictions],
+            "resume_keywords": list(resume_keywords),
+            "top_3_accuracy": evaluation_metrics.get("top_3_accuracy"),
+            "average_max_similarity_score": evaluation_metrics.get("average_max_similarity_score")
+        })
+
+def log_feedback(resume_text, predicted_role, true_role, key=None):
+    append_log("user_feedback", {
         "timestamp": datetime.now().isoformat(),
-        "resume_text": resume_text.replace("\n", "\\n"),
-        "predicted_roles": str([r['role'] for r in predictions]),
-        "confidence_scores": str([r['confidence'] for r in predictions]),
-        "resume_keywords": str(resume_keywords),
-        "top_3_accuracy": evaluation_metrics.get("top_3_accuracy"),
-        "average_max_similarity_score": evaluation_metrics.get("average_max_similarity_score")
-    }
-    file_exists = os.path.isfile(path)
-    with open(path, "a", newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=row.keys(), quoting=csv.QUOTE_ALL)
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row)
+        "key": key,
+        "resume_text": resume_text,
+        "predicted_role": predicted_role,
+        "true_role": true_role
+    })
@@ -0,0 +1,103 @@
+import os
+import json
+from datetime import datetime
+from config.load_config import load_config
+
+PRECISIONS = ("fp32", "bf16", "int8")
+GATE_PATH = "artifacts/precision_gate.json"
+# Read once per process: evaluate_model resolves the active precision on every dashboard rerun
+_model_config = load_config()["model"]
+
+
+class AutocastEncoder:
+    """Runs encode() under CPU bfloat16 autocast; everything else is delegated to the wrapped model."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def encode(self, sentences, convert_to_numpy=True, convert_to_tensor=False, **kwargs):
+        import torch
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            embeddings = self.model.encode(sentences, convert_to_tensor=True, **kwargs)
+        embeddings = embeddings.float()
+        if convert_to_tensor or not convert_to_numpy:
+            return embeddings
+        return embeddings.cpu().numpy()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def apply_precision(model, precision):
+    """Return an encoder for the requested precision; the fp32 model passed in is left untouched."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+    if precision == "fp32":
+        encoder = model
+    elif precision == "bf16":
+        encoder = AutocastEncoder(model)
+    else:
+        import torch
+        # Dynamic int8: Linear weights quantized ahead of time, activations per batch
+        encoder = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    encoder.precision = precision
+    return encoder
+
+
+def _gate_key(precision, model_name, embeddings_version, eval_hash):
+    return f"{model_name}|{precision}|{embeddings_version}|{eval_hash}"
+
+
+def _read_gate():
+    if os.path.exists(GATE_PATH):
+        with open(GATE_PATH, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def cached_gate_result(precision, model_name, embeddings_version, eval_path):
+    from evaluate import file_hash
+    return _read_gate().get(_gate_key(precision, model_name, embeddings_version, file_hash(eval_path)[:16]))
+
+
+def check_precision(encoder, precision, model_name, embeddings_version, min_accuracy, eval_path):
+    """Run the top-3 evaluation with the candidate encoder; cache and return the verdict."""
+    from evaluate import evaluate_model, file_hash
+    cached = cached_gate_result(precision, model_name, embeddings_version, eval_path)
+    if cached is not None and cached["min_accuracy"] == min_accuracy:
+        return cached
+
+    accuracy, _ = evaluate_model(model_path=eval_path, model=encoder, model_tag=precision)
+    verdict = {
+        "precision": precision,
+        "accuracy": round(float(accuracy), 4),
+        "min_accuracy": min_accuracy,
+        "passed": bool(accuracy >= min_accuracy),
+        "checked_at": datetime.now().isoformat()
+    }
+    gate = _read_gate()
+    gate[_gate_key(precision, model_name, embeddings_version, file_hash(eval_path)[:16])] = verdict
+    os.makedirs(os.path.dirname(GATE_PATH), exist_ok=True)
+    # Swapped in whole: workers starting together must never read a half-written gate
+    tmp = f"{GATE_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(gate, f, indent=2)
+    os.replace(tmp, GATE_PATH)
+    return verdict
+
+
+def precision_settings():
+    return {
+        "model_name": _model_config["embedding_model_name"],
+        "precision": _model_config.get("precision", "fp32"),
+        "min_accuracy": float(_model_config.get("precision_min_accuracy", 0.0)),
+        "eval_path": _model_config.get("precision_eval_path", "Sample_Evaluation_Data.csv")
+    }
+
+
+def embedding_dtype(config):
+    """Storage dtype for role embeddings; 'auto' follows the inference precision."""
+    dtype = config["paths"].get("embeddings_dtype", "float32")
+    if dtype == "auto":
+        return "float32" if config["model"].get("precision", "fp32") == "fp32" else "float16"
+    return dtype
@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from config.load_config import load_config
+from instrumentation import inc
+
+
+def hash_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, (bytes, bytearray, memoryview)):
+            part = str(part).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Bounded in-memory LRU with an optional size-capped on-disk JSON tier.
+
+    Disk entries are evicted oldest-access first once the directory grows
+    past max_disk_bytes; a disk hit is promoted back into memory. The directory
+    size is counted once at start-up and then tracked per write, so it is only
+    scanned when an eviction is due.
+    """
+
+    def __init__(self, name, max_items=256, disk_path=None, max_disk_bytes=256 * 1024 * 1024):
+        self.name = name
+        self.max_items = max_items
+        self.disk_path = os.path.join(disk_path, name) if disk_path else None
+        self.max_disk_bytes = max_disk_bytes
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._disk_bytes = 0
+        if self.disk_path:
+            os.makedirs(self.disk_path, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _file(self, key):
+        return os.path.join(self.disk_path, f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                inc("cache_requests_total", cache=self.name, result="hit")
+                return self._items[key]
+        if self.disk_path and os.path.exists(self._file(key)):
+            try:
+                with open(self._file(key), "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(self._file(key))
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                self.hits += 1
+                inc("cache_requests_total", cache=self.name, result="disk_hit")
+                return value
+        self.misses += 1
+        inc("cache_requests_total", cache=self.name, result="miss")
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        if self.disk_path:
+            # Per-thread temp name: the service writes entries from several executor threads
+            tmp = f"{self._file(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            added = os.path.getsize(tmp)
+            try:
+                added -= os.path.getsize(self._file(key))  # overwriting an existing entry
+            except OSError:
+                pass
+            os.replace(tmp, self._file(key))
+            with self._lock:
+                self._disk_bytes += added
+                due = self._disk_bytes > self.max_disk_bytes
+            if due:
+                self._evict_disk()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def _disk_entries(self):
+        entries = []
+        for entry in os.scandir(self.disk_path):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # evicted by another process mid-scan
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict_disk(self):
+        # The scan also re-syncs the running total with entries other processes wrote or removed
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_disk_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                if total <= self.max_disk_bytes:
+                    break
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name):
+    with _caches_lock:
+        if name not in _caches:
+            cache_config = load_config().get("cache", {})
+            _caches[name] = ResultCache(
+                name,
+                max_items=cache_config.get("memory_items", 256),
+                disk_path=cache_config.get("disk_path") or None,
+                max_disk_bytes=int(cache_config.get("disk_max_mb", 256)) * 1024 * 1024
+            )
+        return _caches[name]
@@ -1,11 +1,20 @@
 import pandas as pd
-import pickle
 from datetime import datetime
 import os
 import firebase_admin
-from firebase_admin import credentials, db
-from sentence_transformers import SentenceTransformer
+from firebase_admin import credentials
 import json
+from config.load_config import load_config
+from embedding_store import publish_embeddings, role_prototypes, prototype_settings, current_version
+from embedding_cache import TextEmbeddingCache
+from model_registry import get_base_model
+from precision import embedding_dtype
+from log_store import read_logs
+from sync_firebase_logs import sync_node
+from dedupe import dedupe_records, dedupe_settings, print_report, save_report
+from instrumentation import setup_logging
+
+setup_logging()  # index builds and cache warnings report through the module loggers
 
 # ✅ Initialize Firebase (same logic as you have in firebase_utils.py)
 if not firebase_admin._apps:
@@ -26,12 +35,13 @@ if not firebase_admin._apps:
         print(f"⚠️ Error initializing Firebase in retrain.py: {e}")
         exit()
 
-# ✅ Load model
-model = SentenceTransformer('all-mpnet-base-v2')
+config = load_config()
+model_name = config["model"]["embedding_model_name"]
 
 # Paths
-output_path = "role_embeddings.pkl"
-role_data_path = "job_title_des_cleaned.csv" 
+output_path = config["paths"]["role_embeddings_path"]
+role_data_path = config["paths"]["role_data_path"]
+cache_path = config["paths"].get("embedding_cache_path", "artifacts/embedding_cache")
 
 # ✅ Load base job title dataset
 data_frames = []
@@ -47,33 +57,28 @@ else:
     print("❌ job_title_des_cleaned.csv not found.")
     exit()
 
-# ✅ Pull model_logs from Firebase
-try:
-    logs_ref = db.reference('model_logs')
-    logs_data = logs_ref.get()
-
-    if logs_data:
-        logs_df = pd.DataFrame.from_dict(logs_data, orient='index')
-        logs_df = logs_df[['resume_text']].dropna().copy()
-        logs_df['true_role'] = 'unlabeled'
-        data_frames.append(logs_df)
-    print(f"✅ Pulled {len(logs_df)} records from model_logs.")
-except Exception as e:
-    print(f"⚠️ Error fetching model_logs: {e}")
-
-# ✅ Pull user_feedback from Firebase
-try:
-    feedback_ref = db.reference('user_feedback')
-    feedback_data = feedback_ref.get()
-
-    if feedback_data:
-        feedback_df = pd.DataFrame.from_dict(feedback_data, orient='index')
-        feedback_df = feedback_df[['resume_text', 'true_role']].dropna()
-        feedback_df = feedback_df[feedback_df['true_role'].str.len() > 2]
-        data_frames.append(feedback_df)
-    print(f"✅ Pulled {len(feedback_df)} records from user_feedback.")
-except Exception as e:
-    print(f"⚠️ Error fetching user_feedback: {e}")
+# ✅ Incremental sync (only records after the checkpointed push key), then read only the needed columns
+sync_node("model_logs")
+sync_node("user_feedback")
+
+logs_df = read_logs("model_logs", columns=["timestamp", "resume_text"]).dropna().copy()
+logs_df['true_role'] = 'unlabeled'
+print(f"✅ Loaded {len(logs_df)} records from model_logs.")
+
+feedback_df = read_logs("user_feedback", columns=["timestamp", "resume_text", "true_role"]).dropna()
+feedback_df = feedback_df[feedback_df['true_role'].str.len() > 2]
+print(f"✅ Loaded {len(feedback_df)} records from user_feedback.")
+
+# ✅ Traffic records: drop repeated uploads / near-identical edits / feedback spam, then sample and cap per role,
+# so encode volume and role-vector drift follow new information rather than raw traffic
+traffic_df = pd.concat([logs_df, feedback_df], ignore_index=True).sort_values("timestamp", kind="stable")
+dedupe = dedupe_settings(config)
+if dedupe["enabled"]:
+    traffic_df, dedupe_report = dedupe_records(traffic_df.reset_index(drop=True), settings=dedupe)
+    print_report(dedupe_report)
+    save_report(dedupe_report, dedupe["report_path"])
+if len(traffic_df):
+    data_frames.append(traffic_df[["resume_text", "true_role"]])
 
 if not data_frames:
     print("❌ No valid data found for retraining.")
@@ -81,25 +86,37 @@ if not data_frames:
 
 # ✅ Combine all sources
 combined_df = pd.concat(data_frames, ignore_index=True)
-
-# ✅ Group by role (aggregate multiple resumes per role)
-grouped = combined_df.groupby("true_role")['resume_text'].apply(lambda x: " ".join(x)).reset_index()
-descriptions = grouped["resume_text"].tolist()
-roles = grouped["true_role"].tolist()
-
-print(f"✅ Total retraining roles: {len(roles)}")
-
-# ✅ Generate updated embeddings
-updated_embeddings = model.encode(descriptions, convert_to_tensor=False)
-
-
-output_dir = os.path.dirname(output_path)
-if output_dir:  # Only create if it's not an empty string
-    os.makedirs(output_dir, exist_ok=True)
-
-with open(output_path, "wb") as f:
-    pickle.dump(updated_embeddings, f)
-
-print(f"✅ New role embeddings saved to: {output_path}")
+combined_df = combined_df.dropna(subset=["resume_text", "true_role"])
+texts = combined_df["resume_text"].astype(str).tolist()
+
+# ✅ Encode only texts the per-text cache has not seen (no model load when nothing changed)
+cache = TextEmbeddingCache(cache_path, model_name)
+missing = cache.missing(texts)
+if missing:
+    model = get_base_model()
+    cache.add(missing, model.encode(missing, batch_size=32, convert_to_numpy=True,
+                                    normalize_embeddings=True, show_progress_bar=False))
+text_embeddings = cache.lookup(texts)
+kept = cache.save(keep_texts=texts)
+print(f"✅ Encoded {len(missing)} new texts, reused {len(texts) - len(missing)} cached ({kept} in cache).")
+
+# ✅ Each role's posting + feedback vectors collapse into a few k-means prototypes (no truncated concatenations),
+# so scoring cost and store size follow the number of roles, not the number of postings
+prototypes = prototype_settings(config)
+roles, updated_embeddings = role_prototypes(combined_df["true_role"], text_embeddings,
+                                            prototypes["per_role"], prototypes["method"])
+
+print(f"✅ Total retraining roles: {len(set(roles))} ({len(roles)} prototype rows from {len(texts)} texts)")
+
+# ✅ BM25 term-by-role matrix from postings + labelled feedback ('unlabeled' logs carry no role terms)
+labelled_df = combined_df[combined_df["true_role"] != "unlabeled"]
+
+# ✅ New version (and its ANN and lexical indexes) is written beside the live one, then CURRENT is swapped
+# atomically; running app/service processes pick it up within paths.reload_check_seconds, no restart needed
+publish_embeddings(output_path, updated_embeddings, roles, model_name,
+                   dtype=embedding_dtype(config), index_config=config.get("index", {}),
+                   lexical_texts=(labelled_df["true_role"].tolist(), labelled_df["resume_text"].astype(str).tolist()))
+
+print(f"✅ New role embeddings published: {output_path}/versions/{current_version(output_path)}")
 print(f"🕒 Timestamp: {datetime.now().isoformat()}")
 
@@ -0,0 +1,133 @@
+import numpy as np
+
+REDUCTIONS = ("max", "mean", "top_m")
+# Rows widened to float32 at a time when scoring a low-precision (float16) matrix
+SCORE_BLOCK_ROWS = 8192
+
+
+def as_normalized_matrix(embeddings):
+    if hasattr(embeddings, "detach"):
+        embeddings = embeddings.detach().cpu().numpy()
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def matrix_scores(queries, matrix):
+    """queries @ matrix.T in float32 without holding a float32 copy of a float16 ``matrix``.
+
+    float16 stores stay memory-mapped in their stored dtype, so their pages are shared
+    between processes; each block of rows is widened only for its own product.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    if matrix.dtype == np.float32:
+        return queries @ matrix.T
+    scores = np.empty((queries.shape[0], matrix.shape[0]), dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+        block = np.asarray(matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        scores[:, start:start + SCORE_BLOCK_ROWS] = queries @ block.T
+    return scores
+
+
+class RoleIndex:
+    """Groups embedding rows by role label and scores whole roles in one vectorized pass.
+
+    Rows are never reordered; a permutation plus segment offsets let
+    ``np.*.reduceat`` collapse row scores into one score per role.
+    """
+
+    def __init__(self, roles, embeddings, reduction="max", top_m=3, normalized=False, ann=None, candidates=200):
+        if reduction not in REDUCTIONS:
+            raise ValueError(f"Unknown role reduction '{reduction}', expected one of {REDUCTIONS}")
+        if ann is not None and reduction != "max":
+            raise ValueError("Approximate search only supports the 'max' role reduction")
+        matrix = embeddings if normalized else as_normalized_matrix(embeddings)
+        if matrix.ndim != 2:
+            raise ValueError(f"Role embeddings must be 2-D, got shape {matrix.shape}")
+        if len(roles) != matrix.shape[0]:
+            raise ValueError(
+                f"Role labels ({len(roles)}) do not match embedding rows ({matrix.shape[0]})"
+            )
+
+        self.matrix = matrix
+        self.reduction = reduction
+        self.top_m = max(1, int(top_m))
+        self.ann = ann
+        self.candidates = candidates
+        self.lexical = None
+        self.lexical_weight = 0.0
+
+        self.labels, codes = np.unique(np.asarray(roles, dtype=str), return_inverse=True)
+        self.labels = self.labels.tolist()
+        self._codes = codes
+        self._order = np.argsort(codes, kind="stable")
+        self._codes_sorted = codes[self._order]
+        self.counts = np.bincount(codes, minlength=len(self.labels))
+        self._starts = np.concatenate(([0], np.cumsum(self.counts)[:-1]))
+
+    def attach_lexical(self, lexical, weight):
+        """Fuse ``lexical.scores`` (rows aligned to ``labels``) into top_k with this weight."""
+        self.lexical = lexical
+        self.lexical_weight = float(weight) if lexical is not None else 0.0
+        return self
+
+    def __len__(self):
+        return len(self.labels)
+
+    def row_scores(self, query_embeddings):
+        return matrix_scores(query_embeddings, self.matrix)
+
+    def role_scores(self, query_embeddings):
+        if self.ann is not None:
+            return self._approximate_role_scores(query_embeddings)
+        return self._exact_role_scores(query_embeddings)
+
+    def _exact_role_scores(self, query_embeddings):
+        scores = self.row_scores(query_embeddings)[:, self._order]
+        if self.reduction == "max":
+            return np.maximum.reduceat(scores, self._starts, axis=1)
+        if self.reduction == "mean":
+            return np.add.reduceat(scores, self._starts, axis=1) / self.counts
+        return self._top_m_mean(scores)
+
+    def _approximate_role_scores(self, query_embeddings):
+        # Only the ANN candidate rows are scored; roles with no candidate stay at -inf
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        scores, rows = self.ann.search(queries, self.candidates)
+        role_scores = np.full((len(queries), len(self.labels)), -np.inf, dtype=np.float32)
+        found = rows >= 0
+        query_ids = np.broadcast_to(np.arange(len(queries))[:, None], rows.shape)[found]
+        np.maximum.at(role_scores, (query_ids, self._codes[rows[found]]), scores[found])
+        return role_scores
+
+    def _top_m_mean(self, scores):
+        # Cosine scores lie in [-1, 1], so offsetting each role's segment by 4 * code keeps
+        # segments disjoint: one sort orders every segment by descending score at once.
+        keys = self._codes_sorted * 4.0 + (1.0 - scores.astype(np.float64))
+        keys.sort(axis=1)
+        ranked = 1.0 - (keys - self._codes_sorted * 4.0)
+        rank_in_role = np.arange(scores.shape[1]) - self._starts[self._codes_sorted]
+        ranked[:, rank_in_role >= self.top_m] = 0.0
+        totals = np.add.reduceat(ranked, self._starts, axis=1)
+        return (totals / np.minimum(self.counts, self.top_m)).astype(np.float32)
+
+    def top_k(self, query_embeddings, k=3, lexical_queries=None):
+        role_scores = self.role_scores(query_embeddings)
+        k = min(k, role_scores.shape[1])
+        if self.ann is not None:
+            # Queries whose ANN candidates covered fewer than k roles are rescored exactly
+            short = np.isfinite(role_scores).sum(axis=1) < k
+            if short.any():
+                queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+                role_scores[short] = self._exact_role_scores(queries[short])
+        if self.lexical_weight and lexical_queries is not None:
+            # Fuse over ANN candidates only: non-candidates stay at -inf (0 * -inf would be NaN at weight 1)
+            candidates = np.isfinite(role_scores)
+            role_scores = ((1 - self.lexical_weight) * np.where(candidates, role_scores, 0.0)
+                           + self.lexical_weight * self.lexical.scores(lexical_queries))
+            role_scores[~candidates] = -np.inf
+        part = np.argpartition(-role_scores, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(role_scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
@@ -0,0 +1,241 @@
+import os
+import re
+import pickle
+import hashlib
+import logging
+from collections import Counter, defaultdict
+import pandas as pd
+import model_registry
+from config.load_config import load_config
+
+logger = logging.getLogger(__name__)
+
+# ---- vocabulary mining -----------------------------------------------------
+
+TOKEN = re.compile(r"[A-Za-z0-9.+#/-]*[A-Za-z0-9+#]")
+# Acronyms (AWS, SQL), camelCase (PyTorch, iOS), dotted/plus/hash/slash forms (Node.js, C++, CI/CD), Capitalised words
+TECH = re.compile(r"^(?:[A-Z]{2,}[A-Za-z0-9]*|[A-Za-z]*[a-z][A-Z][A-Za-z0-9]*|[A-Za-z0-9]+[.+#/][A-Za-z0-9.+#/-]*"
+                  r"|[A-Za-z]+-[A-Z][A-Za-z]*|[A-Z][a-z0-9]+)$")
+SEPARATOR = re.compile(r",|;|\(|\)|\band\b|\bor\b|\bfor\b|\bto\b")
+SENTENCE = re.compile(r"(?<=[.!?])\s+")
+# "... using pandas and NumPy", "experience with Docker, Kubernetes" introduce lists of tools
+LIST_INTRO = re.compile(r"\b(?:using|with|like|such as|including)\s+([^.;()]+)", re.I)
+NOT_SKILLS = {
+    "the", "a", "an", "etc", "other", "various", "modern", "large", "new", "relational", "experience", "strong",
+    "knowledge", "operations", "reliability", "cross-functional", "design", "define", "contribute", "write",
+    "build", "develop", "ensure", "manage", "create", "implement", "maintain", "work", "deploy", "integrate",
+    "monitor", "collaborate", "optimize", "support", "ship", "test"
+}
+# Trailing nouns that make "MySQL databases" a variant of "MySQL" rather than a skill of its own
+GENERIC_TAIL = {"teams", "team", "code", "preferred", "tasks", "features", "databases", "pipelines",
+                "frameworks", "systems"}
+
+
+def _normalise(words):
+    stripped = list(words)
+    while stripped and stripped[-1].lower() in GENERIC_TAIL:
+        stripped.pop()
+    # Only a technical name survives losing its tail ("MySQL databases", not "efficient code")
+    if stripped != list(words) and not all(TECH.match(word) for word in stripped):
+        return None
+    words = stripped
+    if not words or words[0].lower() in NOT_SKILLS:
+        return None
+    return " ".join(words)
+
+
+def skill_candidates(text):
+    """Surface forms that look like tools or technologies in one job description."""
+    found = set()
+    for sentence in SENTENCE.split(text):
+        # Runs of technical-looking tokens, skipping the capitalised first word of each sentence
+        for position, segment in enumerate(SEPARATOR.split(sentence)):
+            run = []
+            for i, token in enumerate(TOKEN.findall(segment) + [""]):
+                if token and (position or i) and TECH.match(token) and token.lower() not in NOT_SKILLS:
+                    run.append(token)
+                    continue
+                if run and (term := _normalise(run)):
+                    found.add(term)
+                run = []
+        # Short items of an introduced list catch lowercase tools ("pandas", "power bi")
+        for intro in LIST_INTRO.finditer(sentence):
+            for item in SEPARATOR.split(intro.group(1)):
+                words = item.strip().split()
+                if 1 <= len(words) <= 2 and (term := _normalise(words)):
+                    found.add(term)
+    return found
+
+
+def mine_skills(roles, descriptions, min_count=2, max_role_share=0.34):
+    """Skill vocabulary from job postings.
+
+    A term must appear in at least ``min_count`` postings and in no more than
+    ``max_role_share`` of the roles (words every posting uses are not skills).
+    Returns ({term: display form}, {role: [terms, most frequent first]}).
+    """
+    counts, surfaces, role_counts = Counter(), defaultdict(Counter), defaultdict(Counter)
+    for role, description in zip(roles, descriptions):
+        for surface in skill_candidates(description):
+            term = surface.lower()
+            counts[term] += 1
+            surfaces[term][surface] += 1
+            role_counts[role][term] += 1
+    n_roles = max(len(role_counts), 1)
+    role_share = Counter(term for terms in role_counts.values() for term in terms)
+    vocabulary = {term: surfaces[term].most_common(1)[0][0] for term, n in counts.items()
+                  if n >= min_count and role_share[term] / n_roles <= max_role_share}
+    role_skills = {role: [term for term, _ in terms.most_common() if term in vocabulary]
+                   for role, terms in role_counts.items()}
+    return vocabulary, role_skills
+
+
+# ---- matching --------------------------------------------------------------
+
+def skill_settings(config=None):
+    config = config or load_config()
+    settings = config.get("skills", {})
+    return {
+        "role_data_path": config["paths"]["role_data_path"],
+        "cache_path": settings.get("cache_path", "artifacts/skill_matcher.pkl"),
+        "spacy_model": settings.get("spacy_model", "en_core_web_sm"),
+        "min_count": settings.get("min_count", 2),
+        "max_role_share": settings.get("max_role_share", 0.34),
+        "keywords_per_role": settings.get("keywords_per_role", 5),
+        "batch_size": settings.get("batch_size", 64)
+    }
+
+
+def load_pipeline(model_name="en_core_web_sm"):
+    """Tokenizer-only spaCy pipeline: the phrase matcher needs nothing else."""
+    import spacy
+    try:
+        nlp = spacy.load(model_name, exclude=["tok2vec", "tagger", "parser", "senter", "attribute_ruler",
+                                              "lemmatizer", "ner"])
+    except OSError:
+        logger.warning(f"⚠️ spaCy model '{model_name}' not installed, using the blank English tokenizer")
+        nlp = spacy.blank("en")
+    nlp.max_length = max(nlp.max_length, 2_000_000)
+    return nlp
+
+
+class SkillExtractor:
+    """Precompiled PhraseMatcher over the mined vocabulary (case-insensitive)."""
+
+    def __init__(self, nlp, matcher, vocabulary, role_skills, keywords_per_role=5, batch_size=64):
+        self.nlp = nlp
+        self.matcher = matcher
+        self.vocabulary = vocabulary
+        self.role_skills = role_skills
+        self.keywords_per_role = keywords_per_role
+        self.batch_size = batch_size
+
+    def _skills(self, doc):
+        strings = self.matcher.vocab.strings
+        # Longest match wins at each position ("react.js" over "react"), then first-occurrence order
+        matches = sorted(self.matcher(doc), key=lambda m: (m[1], m[1] - m[2]))
+        skills, end = [], 0
+        for match_id, start, stop in matches:
+            if start < end:
+                continue
+            term = strings[match_id]
+            if term not in skills:
+                skills.append(term)
+            end = stop
+        return skills
+
+    def extract(self, text):
+        """Vocabulary terms found in ``text`` (lowercase), in order of first occurrence."""
+        return self._skills(self.nlp(text))
+
+    def extract_batch(self, texts):
+        return [self._skills(doc) for doc in self.nlp.pipe(texts, batch_size=self.batch_size)]
+
+    def display(self, terms):
+        return [self.vocabulary.get(term, term) for term in terms]
+
+    def keywords(self, role, skills):
+        """The resume's skills that matter for ``role``, most characteristic of the role first."""
+        found = set(skills)
+        ranked = [term for term in self.role_skills.get(role, ()) if term in found]
+        return self.display(ranked[:self.keywords_per_role])
+
+
+def _cache_key(settings, spacy_version):
+    digest = hashlib.sha256()
+    with open(settings["role_data_path"], "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return (digest.hexdigest(), spacy_version, settings["min_count"], settings["max_role_share"])
+
+
+def build_skill_extractor(settings=None):
+    """Mine the vocabulary and compile the matcher, or load both from the on-disk cache."""
+    import spacy
+    from spacy.matcher import PhraseMatcher
+    settings = settings or skill_settings()
+    nlp = load_pipeline(settings["spacy_model"])
+    key = _cache_key(settings, spacy.__version__)
+    cache_path = settings["cache_path"]
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached["key"] == key:
+                return SkillExtractor(nlp, cached["matcher"], cached["vocabulary"], cached["role_skills"],
+                                      settings["keywords_per_role"], settings["batch_size"])
+            logger.info("⚠️ Skill matcher cache is stale, rebuilding...")
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError) as e:
+            logger.warning(f"⚠️ Could not read skill matcher cache {cache_path}: {e}, rebuilding...")
+
+    roles_df = pd.read_csv(settings["role_data_path"]).dropna(subset=["Job Title", "Cleaned_Description"])
+    vocabulary, role_skills = mine_skills(roles_df["Job Title"], roles_df["Cleaned_Description"],
+                                          settings["min_count"], settings["max_role_share"])
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for term in vocabulary:
+        matcher.add(term, [nlp.make_doc(term)])
+
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"key": key, "matcher": matcher, "vocabulary": vocabulary, "role_skills": role_skills}, f)
+        os.replace(tmp, cache_path)
+    logger.info(f"✅ Skill matcher built: {len(vocabulary)} skills across {len(role_skills)} roles")
+    return SkillExtractor(nlp, matcher, vocabulary, role_skills, settings["keywords_per_role"],
+                          settings["batch_size"])
+
+
+model_registry.register("skills", build_skill_extractor)
+
+
+def get_skill_extractor():
+    return model_registry.get("skills")
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build the skill matcher cache and show the mined vocabulary.")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the existing cache")
+    parser.add_argument("--resumes", default="Sample_Evaluation_Data.csv",
+                        help="CSV with a resume_text column used for a timing run")
+    args = parser.parse_args()
+
+    settings = skill_settings()
+    if args.rebuild and os.path.exists(settings["cache_path"]):
+        os.remove(settings["cache_path"])
+    started = time.perf_counter()
+    extractor = build_skill_extractor(settings)
+    print(f"✅ {len(extractor.vocabulary)} skills ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+    print(", ".join(sorted(extractor.vocabulary.values(), key=str.lower)))
+
+    if os.path.exists(args.resumes):
+        texts = pd.read_csv(args.resumes)["resume_text"].dropna().astype(str).tolist()
+        started = time.perf_counter()
+        found = extractor.extract_batch(texts)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"⏱️ {len(texts)} resumes in {elapsed:.1f} ms ({elapsed / max(len(texts), 1):.2f} ms/resume), "
+              f"{sum(map(len, found)) / max(len(texts), 1):.1f} skills/resume")
@@ -1,63 +1,140 @@
 # sync_firebase_logs.py
 
 import os
-import pandas as pd
+import json
+import argparse
+from datetime import datetime, timedelta
 import firebase_admin
 from firebase_admin import credentials, db
-import json
-from datetime import datetime
+from config.load_config import load_config
+from firebase_utils import LocalReference, push_key_millis
+from log_store import get_log_store
 
-# --- Initialize Firebase ---
-if not firebase_admin._apps:
-    try:
-        # Assuming you have FIREBASE_KEY in your GitHub secrets
-        cred_json = os.getenv("FIREBASE_KEY")
-        if cred_json:
-            cred_dict = json.loads(cred_json)
-            cred = credentials.Certificate(cred_dict)
-            firebase_admin.initialize_app(cred, {
-                'databaseURL': 'https://resume-role-recommender-default-rtdb.firebaseio.com/'
-            })
-        else:
-            raise ValueError("No FIREBASE_KEY found in environment.")
-    except Exception as e:
-        print(f"Error initializing Firebase: {e}")
-        exit(1)
+NODES = ("user_feedback", "model_logs")
 
-# --- Pull Data from Firebase ---
-def download_from_firebase(node_path, local_csv_path, columns):
-    try:
-        ref = db.reference(node_path)
-        data = ref.get()
 
-        if data:
-            records = list(data.values())
-            df = pd.DataFrame(records)
+def sync_settings():
+    settings = load_config().get("sync", {})
+    return {
+        "page_size": settings.get("page_size", 500),
+        "checkpoint_path": settings.get("checkpoint_path", "logs/store/sync_checkpoint.json"),
+        "dedupe_window_hours": settings.get("dedupe_window_hours", 24)
+    }
+
+
+# --- High-water mark: last push key appended per node ---
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+def save_checkpoint(path, checkpoint):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
 
-            # Ensure correct columns
-            for col in columns:
-                if col not in df.columns:
-                    df[col] = ""
 
-            df = df[columns]
-            os.makedirs(os.path.dirname(local_csv_path), exist_ok=True)
-            df.to_csv(local_csv_path, index=False)
-            print(f"✅ Downloaded and saved {node_path} to {local_csv_path}")
-        else:
-            print(f"⚠️ No data found at {node_path}")
+def iter_pages(reference, after_key=None, page_size=500):
+    """Yield [(key, record), ...] pages in push-key order, strictly after ``after_key``."""
+    while True:
+        query = reference.order_by_key()
+        if after_key is not None:
+            # start_at is inclusive, so fetch one extra and drop the key we already have
+            query = query.start_at(after_key)
+        limit = page_size + (after_key is not None)
+        page = query.limit_to_first(limit).get() or {}
+        items = [(k, v) for k, v in page.items() if k != after_key]
+        if not items:
+            return
+        yield items
+        if len(page) < limit:
+            return
+        after_key = items[-1][0]
 
+
+def _known_keys(store, first_key, window_hours):
+    # Rows the app logged locally (and rows from an interrupted page) already carry their push key;
+    # only the recent part of the key column is read, so this stays cheap as the log grows
+    if first_key is None:
+        return set(store.read(columns=["key"])["key"].dropna())
+    since = datetime.fromtimestamp(push_key_millis(first_key) / 1000) - timedelta(hours=window_hours)
+    return set(store.read(columns=["key"], since=since.isoformat())["key"].dropna())
+
+
+# --- Pull new Firebase records into the local log store ---
+def sync_node(node_path, store=None, reference_factory=None, full=False, settings=None):
+    """Page through ``node_path`` after the checkpointed key and append only new records.
+
+    ``reference_factory`` defaults to ``firebase_admin.db.reference``; a ``LocalReference``
+    (or anything with the same order_by_key/start_at/limit_to_first/get API) works offline.
+    ``full=True`` ignores the checkpoint and re-scans the node, still skipping stored keys.
+    """
+    settings = settings or sync_settings()
+    store = store or get_log_store(node_path)
+    reference_factory = reference_factory or db.reference
+    checkpoint = load_checkpoint(settings["checkpoint_path"])
+    after_key = None if full else checkpoint.get(node_path)
+    synced = 0
+    known = None
+    try:
+        for page in iter_pages(reference_factory(node_path), after_key, settings["page_size"]):
+            if known is None:
+                # Read once per sync; later pages only have newer keys, so the window still covers them
+                known = _known_keys(store, None if full else page[0][0], settings["dedupe_window_hours"])
+            new_records = [{**record, "key": key} for key, record in page
+                           if key not in known and isinstance(record, dict)]
+            # Backfilled rows are old, so age-based rotation would cut one segment per page;
+            # only the size limit applies until the sync is done
+            store.extend(new_records, rotate_by_age=False)
+            known.update(record["key"] for record in new_records)
+            synced += len(new_records)
+            # Checkpoint only after the page is on disk: a crash re-reads at most one page
+            checkpoint[node_path] = page[-1][0]
+            save_checkpoint(settings["checkpoint_path"], checkpoint)
+        store.check_rotation()
+        print(f"✅ Synced {synced} new {node_path} records into {store.path} "
+              f"(checkpoint {checkpoint.get(node_path)})")
     except Exception as e:
-        print(f"❌ Error downloading {node_path}: {e}")
+        print(f"❌ Error syncing {node_path} after {synced} records: {e}")
+    return synced
+
+
+def initialize_sync_firebase():
+    if not firebase_admin._apps:
+        try:
+            # Assuming you have FIREBASE_KEY in your GitHub secrets
+            cred_json = os.getenv("FIREBASE_KEY")
+            if cred_json:
+                cred_dict = json.loads(cred_json)
+                cred = credentials.Certificate(cred_dict)
+                firebase_admin.initialize_app(cred, {
+                    'databaseURL': 'https://resume-role-recommender-default-rtdb.firebaseio.com/'
+                })
+            else:
+                raise ValueError("No FIREBASE_KEY found in environment.")
+        except Exception as e:
+            print(f"Error initializing Firebase: {e}")
+            exit(1)
+
 
-# --- Paths and Columns ---
-user_feedback_csv = "logs/user_feedback.csv"
-model_logs_csv = "logs/model_logs.csv"
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally sync Firebase logs into the local log store.")
+    parser.add_argument("--full", action="store_true", help="ignore the checkpoint and re-scan every record")
+    parser.add_argument("--from-export", default=None,
+                        help="sync from a Firebase JSON export file instead of the live database")
+    args = parser.parse_args()
 
-user_feedback_columns = ["timestamp", "resume_text", "predicted_role", "true_role"]
-model_logs_columns = ["timestamp", "resume_text", "predicted_roles", "confidence_scores", "resume_keywords", "top_3_accuracy", "average_max_similarity_score"]
+    reference_factory = None
+    if args.from_export:
+        with open(args.from_export, "r") as f:
+            reference_factory = LocalReference(json.load(f)).child
+    else:
+        initialize_sync_firebase()
 
-# --- Download ---
-download_from_firebase("user_feedback", user_feedback_csv, user_feedback_columns)
-download_from_firebase("model_logs", model_logs_csv, model_logs_columns)
+    for node in NODES:
+        sync_node(node, reference_factory=reference_factory, full=args.full)
 
-print("\n🎯 Firebase sync complete.")
+    print("\n🎯 Firebase sync complete.")
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules live at the repo root and read config/config.yaml relative to the working directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from dedupe import MinHasher, dedupe_records, normalize_text, shingle_hashes
+
+SETTINGS = {"enabled": True, "shingle_words": 5, "num_perm": 64, "bands": 16, "threshold": 0.8,
+            "max_per_role": 0, "sample_fraction": 1.0}
+
+
+def words(seed, n=120):
+    rng = np.random.default_rng(seed)
+    return [f"w{i}" for i in rng.integers(0, 5000, n)]
+
+
+def shingles(text, k=5):
+    tokens = normalize_text(text).split()
+    return {" ".join(tokens[i:i + k]) for i in range(max(1, len(tokens) - k + 1))}
+
+
+def jaccard(a, b):
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def naive_dedupe(texts, roles, threshold):
+    kept = []
+    for i, (text, role) in enumerate(zip(texts, roles)):
+        if not any(roles[j] == role and jaccard(texts[j], text) >= threshold for j in kept):
+            kept.append(i)
+    return kept
+
+
+def test_minhash_estimates_shingle_jaccard():
+    hasher = MinHasher(num_perm=256)
+    base = words(1)
+    for changed in (0, 2, 10, 40, 120):
+        other = base[:len(base) - changed] + words(2, changed)
+        a, b = " ".join(base), " ".join(other)
+        estimate = np.mean(hasher.signature(shingle_hashes(normalize_text(a)))
+                           == hasher.signature(shingle_hashes(normalize_text(b))))
+        assert abs(estimate - jaccard(a, b)) < 0.12
+
+
+def test_dedupe_matches_pairwise_jaccard():
+    texts, roles = [], []
+    for seed in range(12):
+        base = words(seed)
+        role = "Data Analyst" if seed % 2 else "Java Developer"
+        texts.append(" ".join(base))
+        roles.append(role)
+        # Near copy: one word changed at the end (Jaccard ~0.96); far copy: half rewritten (~0.3)
+        texts.append(" ".join(base[:-1] + ["edited"]))
+        roles.append(role)
+        texts.append(" ".join(base[:60] + words(100 + seed, 60)))
+        roles.append(role)
+    # The same text under another role is not a duplicate
+    texts.append(texts[0])
+    roles.append("Data Scientist")
+    df = pd.DataFrame({"resume_text": texts, "true_role": roles})
+
+    kept, report = dedupe_records(df, settings=SETTINGS)
+    assert kept.index.tolist() == naive_dedupe(texts, roles, SETTINGS["threshold"])
+    assert report["near_duplicates"] == 12
+    assert report["output"] == len(kept)
+
+
+def test_exact_duplicates_ignore_case_and_punctuation():
+    df = pd.DataFrame({"resume_text": ["Python, SQL & AWS!", "python sql aws", "Python SQL AWS", "Go"],
+                       "true_role": ["Data Analyst"] * 3 + ["Go Developer"]})
+    kept, report = dedupe_records(df, settings={**SETTINGS, "threshold": 1.0})
+    assert kept.index.tolist() == [0, 3]
+    assert report["exact_duplicates"] == 2
+
+
+def test_sampling_is_stratified_and_stable():
+    texts = [" ".join(words(seed)) for seed in range(40)]
+    roles = ["big"] * 30 + ["small"] * 10
+    df = pd.DataFrame({"resume_text": texts, "true_role": roles})
+    settings = {**SETTINGS, "sample_fraction": 0.25, "max_per_role": 5}
+
+    kept, report = dedupe_records(df, settings=settings)
+    counts = kept["true_role"].value_counts().to_dict()
+    assert counts == {"big": 5, "small": 3}  # ceil(0.25 * 30) = 8 capped to 5; ceil(0.25 * 10) = 3
+    assert report["sampled_out"] == 29 and report["capped"] == 3
+    # Selection depends on content only: new records for one role do not reshuffle another
+    more = pd.concat([df, pd.DataFrame({"resume_text": [" ".join(words(99))], "true_role": ["small"]})],
+                     ignore_index=True)
+    again, _ = dedupe_records(more, settings=settings)
+    assert again[again["true_role"] == "big"].index.tolist() == kept[kept["true_role"] == "big"].index.tolist()
+    assert dedupe_records(df, settings=settings)[0].index.tolist() == kept.index.tolist()
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from embedding_store import (VERSIONS_DIR, EmbeddingStoreError, current_version, load_embeddings,
+                             publish_embeddings, publish_version, save_embeddings)
+
+
+def unit_rows(seed, rows=6, dim=8):
+    matrix = np.random.default_rng(seed).normal(size=(rows, dim))
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+ROLES = ["Data Analyst", "Java Developer", "Data Analyst", "Nurse", "Java Developer", "Nurse"]
+
+
+def test_publish_and_roll_back_current_pointer(tmp_path):
+    path = str(tmp_path / "store")
+    first, second = unit_rows(1), unit_rows(2)
+    v1 = publish_embeddings(path, first * 3, ROLES, "model-a")  # stored normalized
+    v1_name = current_version(path)
+    publish_embeddings(path, second, ROLES[::-1], "model-a")
+    assert current_version(path) != v1_name
+    loaded = load_embeddings(path, verify_hash=True)
+    np.testing.assert_allclose(loaded.embeddings, second, atol=1e-6)
+    assert loaded.roles == ROLES[::-1]
+
+    # Rolling back is re-pointing CURRENT at the kept version
+    publish_version(path, os.path.join(path, VERSIONS_DIR, v1_name))
+    rolled_back = load_embeddings(path, verify_hash=True)
+    assert current_version(path) == v1_name
+    assert rolled_back.manifest["sha256"] == v1["sha256"]
+    np.testing.assert_allclose(rolled_back.embeddings, first, atol=1e-6)
+    assert rolled_back.roles == ROLES
+
+
+def test_old_versions_pruned_but_open_maps_stay_readable(tmp_path):
+    path = str(tmp_path / "store")
+    publish_embeddings(path, unit_rows(0), ROLES, "model-a", keep=2)
+    live = load_embeddings(path)
+    expected = np.array(live.embeddings)
+    for seed in (1, 2, 3):
+        publish_embeddings(path, unit_rows(seed), ROLES, "model-a", keep=2)
+
+    versions = sorted(os.listdir(os.path.join(path, VERSIONS_DIR)))
+    assert len(versions) == 2 and versions[-1] == current_version(path)
+    # The first version's directory is gone, its memmap still reads the old rows
+    np.testing.assert_array_equal(live.embeddings, expected)
+
+
+def test_float16_store_is_mapped_without_upcasting(tmp_path):
+    path = str(tmp_path / "store")
+    matrix = unit_rows(4)
+    publish_embeddings(path, matrix, ROLES, "model-a", dtype="float16")
+    loaded = load_embeddings(path, verify_hash=True)
+    assert isinstance(loaded.embeddings, np.memmap) and loaded.embeddings.dtype == np.float16
+    np.testing.assert_array_equal(loaded.embeddings, matrix.astype(np.float32).astype(np.float16))
+
+
+def test_flat_store_is_read_until_first_publish(tmp_path):
+    path = str(tmp_path / "store")
+    save_embeddings(path, unit_rows(5), ROLES, "model-a")
+    assert current_version(path) is None
+    np.testing.assert_allclose(load_embeddings(path).embeddings, unit_rows(5), atol=1e-6)
+
+    publish_embeddings(path, unit_rows(6), ROLES, "model-a")
+    assert not os.path.exists(os.path.join(path, "embeddings.npy"))
+    np.testing.assert_allclose(load_embeddings(path).embeddings, unit_rows(6), atol=1e-6)
+
+
+def test_mismatched_model_and_corrupt_matrix_are_rejected(tmp_path):
+    path = str(tmp_path / "store")
+    publish_embeddings(path, unit_rows(7), ROLES, "model-a")
+    with pytest.raises(EmbeddingStoreError):
+        load_embeddings(path, expected_model="model-b")
+
+    matrix_path = os.path.join(path, VERSIONS_DIR, current_version(path), "embeddings.npy")
+    matrix = np.load(matrix_path)
+    matrix[0, 0] += 0.5
+    np.save(matrix_path, matrix)
+    load_embeddings(path)  # shape and dtype still match the manifest
+    with pytest.raises(EmbeddingStoreError):
+        load_embeddings(path, verify_hash=True)
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+import pytest
+from firebase_utils import BackgroundUploader, LocalReference
+
+
+class FakeBackend:
+    """LocalReference-backed stand-in for firebase_admin.db.reference that can fail or stall on demand."""
+
+    def __init__(self):
+        self.data = {}
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+        self.updates = 0
+        self.fail_after = None  # fail every update once this many have succeeded
+
+    def reference(self, path="/"):
+        backend = self
+
+        class Reference(LocalReference):
+            def update(self, values):
+                backend.release.wait(5)
+                if backend.fail or (backend.fail_after is not None and backend.updates >= backend.fail_after):
+                    raise ConnectionError("firebase offline")
+                backend.updates += 1
+                super().update(values)
+
+        return Reference(self.data, path)
+
+
+@pytest.fixture
+def backend():
+    return FakeBackend()
+
+
+def make_uploader(backend, tmp_path, **kwargs):
+    return BackgroundUploader(reference_factory=backend.reference, spool_path=str(tmp_path / "spool.jsonl"),
+                              flush_interval=0.05, **kwargs)
+
+
+def spooled_keys(path):
+    """Keys still on disk: the spool plus any replay in progress."""
+    keys = []
+    for part in (path + ".replaying", path):
+        if os.path.exists(part):
+            with open(part, "r", encoding="utf-8") as f:
+                keys += [json.loads(line)["key"] for line in f]
+    return keys
+
+
+def test_records_are_sent_in_batches(backend, tmp_path):
+    uploader = make_uploader(backend, tmp_path, max_batch=10).start()
+    keys = [uploader.submit("model_logs", {"n": i}) for i in range(25)]
+    assert uploader.flush()
+    uploader.close()
+
+    assert sorted(backend.data["model_logs"]) == sorted(keys)
+    assert backend.updates <= 5
+    assert uploader.sent == 25 and uploader.spooled == 0
+
+
+def test_failed_batches_are_spooled_and_replayed(backend, tmp_path):
+    backend.fail = True
+    uploader = make_uploader(backend, tmp_path, retry_interval=0.0)
+    uploader._send_or_spool([("user_feedback", "k1", {"n": 1}), ("user_feedback", "k2", {"n": 2})])
+    assert spooled_keys(uploader.spool_path) == ["k1", "k2"]
+
+    uploader._drain_spool()
+    assert spooled_keys(uploader.spool_path) == ["k1", "k2"]  # still offline: kept for the next retry
+
+    backend.fail = False
+    uploader._drain_spool()
+    assert spooled_keys(uploader.spool_path) == []
+    assert set(backend.data["user_feedback"]) == {"k1", "k2"}
+
+
+def test_spooling_does_not_wait_for_a_stalled_replay(backend, tmp_path):
+    uploader = make_uploader(backend, tmp_path)
+    uploader._spool([("model_logs", "old", {"n": 0})])
+    backend.release.clear()
+    replay = threading.Thread(target=uploader._drain_spool)
+    replay.start()
+    time.sleep(0.1)  # replay is now blocked inside the network call
+
+    started = time.monotonic()
+    uploader._spool([("model_logs", "new", {"n": 1})])
+    assert time.monotonic() - started < 1.0
+    assert replay.is_alive()
+
+    backend.release.set()
+    replay.join(5)
+    assert set(backend.data["model_logs"]) == {"old"}
+    assert spooled_keys(uploader.spool_path) == ["new"]
+
+
+def test_failed_replay_keeps_unsent_records_on_disk(backend, tmp_path):
+    uploader = make_uploader(backend, tmp_path, max_batch=2, retry_interval=0.0)
+    items = [("model_logs", f"k{i}", {"n": i}) for i in range(5)]
+    uploader._spool(items)
+    backend.fail_after = 1  # first batch acknowledged, the second raises inside _send
+
+    uploader._drain_spool()
+    assert set(backend.data["model_logs"]) == {"k0", "k1"}
+    assert spooled_keys(uploader.spool_path) == ["k2", "k3", "k4"]
+
+    uploader._spool([("model_logs", "k5", {"n": 5})])
+    backend.fail_after = None
+    uploader._drain_spool()  # the interrupted replay is finished first
+    uploader._drain_spool()
+    assert spooled_keys(uploader.spool_path) == []
+    assert set(backend.data["model_logs"]) == {f"k{i}" for i in range(6)}
+
+
+def test_replay_left_by_a_crash_is_sent_on_start(backend, tmp_path):
+    first = make_uploader(backend, tmp_path)
+    first._spool([("user_feedback", "k1", {"n": 1}), ("user_feedback", "k2", {"n": 2})])
+    # Killed mid-replay: the records were moved aside but never acknowledged
+    os.replace(first.spool_path, first.replay_path)
+
+    restarted = make_uploader(backend, tmp_path).start()
+    restarted.close()
+    assert set(backend.data["user_feedback"]) == {"k1", "k2"}
+    assert spooled_keys(restarted.spool_path) == []
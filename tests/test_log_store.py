@@ -0,0 +1,64 @@
+import os
+
+from log_store import ACTIVE_FILE, ROTATING_FILE, LogStore
+
+
+def record(n):
+    return {"timestamp": f"2025-03-{1 + n // 24:02d}T{n % 24:02d}:00:00", "key": f"k{n:03d}",
+            "resume_text": f"resume {n} " + "x" * 40, "predicted_roles": ["Data Analyst", f"role {n}"],
+            "confidence_scores": [90.0, float(n)], "resume_keywords": ["python"]}
+
+
+def make_store(tmp_path, **kwargs):
+    options = {"flush_rows": 7, "rotate_bytes": 2000, "rotate_seconds": 1e12, "import_legacy": False}
+    options.update(kwargs)
+    return LogStore("model_logs", root=str(tmp_path / "store"), **options)
+
+
+def test_rotated_segments_and_head_read_back_every_record(tmp_path):
+    store = make_store(tmp_path)
+    records = [record(n) for n in range(100)]
+    for r in records:
+        store.append(r)
+    store.flush()
+
+    assert len(store.segments()) > 1
+    assert os.path.getsize(os.path.join(store.path, ACTIVE_FILE)) < store.rotate_bytes
+    df = store.read()
+    assert df["key"].tolist() == [r["key"] for r in records]
+    assert df["predicted_roles"].map(list).tolist() == [r["predicted_roles"] for r in records]
+    assert df["top_3_accuracy"].isna().all()
+
+
+def test_time_window_matches_naive_filter(tmp_path):
+    store = make_store(tmp_path)
+    records = [record(n) for n in range(100)]
+    for r in records:
+        store.append(r)
+    since, until = "2025-03-02T05:00:00", "2025-03-04T01:00:00"
+
+    expected = [r["key"] for r in records if since <= r["timestamp"] <= until]
+    df = store.read(columns=["key"], since=since, until=until)
+    assert list(df.columns) == ["key"]
+    assert df["key"].tolist() == expected
+    # Segments entirely outside the window are not opened
+    assert len(store.segments(since, until)) < len(store.segments())
+
+
+def test_interrupted_rotation_is_finished_by_the_next_write(tmp_path):
+    store = make_store(tmp_path, rotate_bytes=10 ** 9)
+    store.extend([record(n) for n in range(5)])
+    # A crash between os.replace(active, rotating) and the parquet write
+    os.replace(os.path.join(store.path, ACTIVE_FILE), os.path.join(store.path, ROTATING_FILE))
+
+    store.extend([record(5)])
+    assert not os.path.exists(os.path.join(store.path, ROTATING_FILE))
+    assert len(store.segments()) == 1
+    assert store.read(columns=["key"])["key"].tolist() == [f"k{n:03d}" for n in range(6)]
+
+
+def test_old_head_rotates_by_age(tmp_path):
+    store = make_store(tmp_path, rotate_bytes=10 ** 9, rotate_seconds=60)
+    store.extend([record(0)])
+    assert len(store.segments()) == 1
+    assert not os.path.exists(os.path.join(store.path, ACTIVE_FILE))
@@ -0,0 +1,63 @@
+import os
+from collections import OrderedDict
+
+from result_cache import ResultCache, hash_key
+
+
+def entry_files(cache):
+    return sorted(name[:-5] for name in os.listdir(cache.disk_path) if name.endswith(".json"))
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache("lru", max_items=3)
+    naive = OrderedDict()
+    for op, key in [("put", "a"), ("put", "b"), ("put", "c"), ("get", "a"), ("put", "d"),
+                    ("get", "b"), ("put", "e"), ("get", "c"), ("get", "a"), ("put", "b")]:
+        if op == "put":
+            cache.put(key, {"value": key})
+            naive[key] = {"value": key}
+            naive.move_to_end(key)
+            if len(naive) > 3:
+                naive.popitem(last=False)
+        else:
+            expected = naive.get(key)
+            if expected is not None:
+                naive.move_to_end(key)
+            assert cache.get(key) == expected
+    assert list(cache._items) == list(naive)
+
+
+def test_disk_tier_keeps_recently_used_entries_under_budget(tmp_path):
+    value = {"results": ["x" * 80]}
+    probe = ResultCache("probe", disk_path=str(tmp_path))
+    probe.put("probe", value)
+    size = os.path.getsize(probe._file("probe"))
+
+    cache = ResultCache("disk", max_items=1, disk_path=str(tmp_path), max_disk_bytes=4 * size)
+    for n in range(4):
+        cache.put(f"k{n}", value)
+        os.utime(cache._file(f"k{n}"), (1000 + n, 1000 + n))
+    assert cache.get("k0") == value  # disk hit refreshes k0's access time
+    cache.put("k4", value)
+
+    assert entry_files(cache) == ["k0", "k2", "k3", "k4"]
+    assert cache._disk_bytes == 4 * size
+    assert cache.get("k1") is None
+
+    # A new process counts what is already on disk
+    reopened = ResultCache("disk", disk_path=str(tmp_path), max_disk_bytes=4 * size)
+    assert reopened._disk_bytes == 4 * size
+    assert reopened.get("k3") == value
+
+
+def test_hash_key_keeps_parts_separate():
+    key = hash_key("resume text", 3, b"model")
+    assert key == hash_key("resume text", "3", "model")
+    assert key != hash_key("resume text3", "model")
+
+
+def test_rewrites_are_counted_once(tmp_path):
+    cache = ResultCache("rewrite", disk_path=str(tmp_path))
+    for _ in range(5):
+        cache.put("same", {"value": 1})
+    assert cache._disk_bytes == os.path.getsize(cache._file("same"))
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from role_index import RoleIndex, as_normalized_matrix
+
+
+def naive_role_scores(roles, matrix, queries, reduction, top_m):
+    labels = sorted(set(roles))
+    scores = queries @ as_normalized_matrix(matrix).T
+    out = np.empty((len(queries), len(labels)), dtype=np.float64)
+    for q in range(len(queries)):
+        for j, label in enumerate(labels):
+            rows = sorted((scores[q, i] for i, r in enumerate(roles) if r == label), reverse=True)
+            if reduction == "max":
+                out[q, j] = rows[0]
+            elif reduction == "mean":
+                out[q, j] = np.mean(rows)
+            else:
+                out[q, j] = np.mean(rows[:top_m])
+    return labels, out
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    # Uneven group sizes, interleaved rows, and a single-row role
+    roles = ["b", "a", "c", "a", "b", "a", "d", "c", "a", "b", "a"]
+    # Callers pass unit-length queries (the encoder normalizes them)
+    return roles, rng.normal(size=(len(roles), 16)), as_normalized_matrix(rng.normal(size=(4, 16)))
+
+
+@pytest.mark.parametrize("reduction", ["max", "mean", "top_m"])
+def test_role_scores_match_naive_grouping(corpus, reduction):
+    roles, matrix, queries = corpus
+    index = RoleIndex(roles, matrix, reduction=reduction, top_m=2)
+    labels, expected = naive_role_scores(roles, matrix, queries, reduction, 2)
+
+    assert index.labels == labels
+    np.testing.assert_allclose(index.role_scores(queries), expected, atol=1e-5)
+
+
+def test_top_k_returns_best_roles_in_order(corpus):
+    roles, matrix, queries = corpus
+    index = RoleIndex(roles, matrix, reduction="top_m", top_m=3)
+    _, expected = naive_role_scores(roles, matrix, queries, "top_m", 3)
+
+    top_idx, top_scores = index.top_k(queries, k=3)
+    np.testing.assert_array_equal(top_idx, np.argsort(-expected, axis=1)[:, :3])
+    np.testing.assert_allclose(top_scores, -np.sort(-expected, axis=1)[:, :3], atol=1e-5)
+
+
+def test_float16_matrix_scores_like_float32(corpus):
+    roles, matrix, queries = corpus
+    exact = RoleIndex(roles, matrix)
+    half = RoleIndex(roles, as_normalized_matrix(matrix).astype(np.float16), normalized=True)
+
+    np.testing.assert_allclose(half.role_scores(queries), exact.role_scores(queries), atol=2e-3)
@@ -0,0 +1,57 @@
+from firebase_utils import LocalReference, generate_push_key
+from log_store import LogStore
+from sync_firebase_logs import load_checkpoint, sync_node
+
+
+def feedback(n):
+    return {"timestamp": f"2025-01-01T00:00:{n:02d}", "resume_text": f"resume {n}",
+            "predicted_role": "Data Analyst", "true_role": "Data Scientist"}
+
+
+class RecordingReference(LocalReference):
+    """LocalReference that remembers the start_at key of every page query."""
+    starts = []
+
+    def start_at(self, key):
+        self.starts.append(key)
+        return super().start_at(key)
+
+
+def test_second_sync_only_picks_up_new_records(tmp_path):
+    data = {"user_feedback": {generate_push_key(): feedback(n) for n in range(5)}}
+    store = LogStore("user_feedback", root=str(tmp_path / "store"), import_legacy=False)
+    settings = {"page_size": 2, "checkpoint_path": str(tmp_path / "checkpoint.json"), "dedupe_window_hours": 24}
+    reference = RecordingReference(data).child
+    RecordingReference.starts = []
+
+    assert sync_node("user_feedback", store, reference, settings=settings) == 5
+    first_checkpoint = load_checkpoint(settings["checkpoint_path"])["user_feedback"]
+    assert first_checkpoint == max(data["user_feedback"])
+
+    new_keys = [generate_push_key() for _ in range(3)]
+    data["user_feedback"].update({key: feedback(10 + i) for i, key in enumerate(new_keys)})
+    RecordingReference.starts = []
+    assert sync_node("user_feedback", store, reference, settings=settings) == 3
+
+    # The second run resumed from the first checkpoint instead of re-reading the node
+    assert RecordingReference.starts[0] == first_checkpoint
+    assert load_checkpoint(settings["checkpoint_path"])["user_feedback"] == new_keys[-1]
+    keys = store.read(columns=["key"])["key"].tolist()
+    assert sorted(keys) == sorted(data["user_feedback"])
+
+    assert sync_node("user_feedback", store, reference, settings=settings) == 0
+    assert len(store.read(columns=["key"])) == 8
+
+
+def test_full_backfill_writes_one_segment_and_skips_stored_keys(tmp_path):
+    data = {"user_feedback": {generate_push_key(): feedback(n) for n in range(7)}}
+    store = LogStore("user_feedback", root=str(tmp_path / "store"), import_legacy=False)
+    settings = {"page_size": 2, "checkpoint_path": str(tmp_path / "checkpoint.json"), "dedupe_window_hours": 24}
+    reference = LocalReference(data).child
+
+    assert sync_node("user_feedback", store, reference, settings=settings) == 7
+    # The 2025 timestamps are past rotate_seconds, yet the four pages land in a single segment
+    assert len(store.segments()) == 1
+
+    assert sync_node("user_feedback", store, reference, full=True, settings=settings) == 0
+    assert sorted(store.read(columns=["key"])["key"]) == sorted(data["user_feedback"])